@@ -11,17 +11,30 @@ from pyzbar.pyzbar import decode as decode_qr
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
+BIT_CHARS = b'01 \n'
+B64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
 def is_base64(data: bytes) -> bool:
-    try:
-        return data == base64.b64encode(base64.b64decode(data, validate=True))
-    except Exception:
+    if len(data) % 4:
         return False
+    body = data.rstrip(b'=')
+    pad = len(data) - len(body)
+    if pad > 2 or body.translate(None, B64_ALPHABET):
+        return False
+    # Unused bits must be zero for the data to re-encode identically
+    return not pad or not B64_ALPHABET.index(body[-1]) & (0x0F if pad == 2 else 0x03)
 
-def bin_to_bytes(bin_str: str) -> bytes:
-    bin_str = ''.join(bin_str.split())
-    if not all(c in '01' for c in bin_str):
+def bin_to_bytes(bin_str: Union[str, bytes]) -> bytes:
+    if isinstance(bin_str, str):
+        bin_str = bin_str.encode('ascii')
+    bits = bin_str.translate(None, b' \t\n\r\x0b\x0c')
+    if bits.translate(None, b'01'):
         raise ValueError("Invalid binary string")
-    return bytes(int(bin_str[i:i+8], 2) for i in range(0, len(bin_str), 8))
+    whole = len(bits) - len(bits) % 8
+    data = int(bits[:whole], 2).to_bytes(whole // 8, 'big') if whole else b''
+    if whole < len(bits):
+        data += bytes([int(bits[whole:], 2)])
+    return data
 
 def decode_qr_code(img_path: Union[str, Path]) -> bytes:
     try:
@@ -34,21 +47,15 @@ def decode_qr_code(img_path: Union[str, Path]) -> bytes:
         raise ValueError(f"Error loading image: {e}")
 
 def process_data(data: bytes, bin_mode: bool) -> bytes:
-    try:
-        txt = data.decode('ascii')
-        if all(c in '01 \n' for c in txt):
-            return bin_to_bytes(txt)
-    except UnicodeDecodeError:
-        pass
-
-    if is_base64(data):
-        try:
-            decoded = base64.b64decode(data)
-            txt = decoded.decode('ascii')
-            return bin_to_bytes(txt) if all(c in '01 \n' for c in txt) else decoded
-        except (UnicodeDecodeError, ValueError):
-            pass
-    return data
+    # Single-pass classification: bit string, base64 (of a bit string) or raw
+    if not data.translate(None, BIT_CHARS):
+        return bin_to_bytes(data)
+    if not is_base64(data):
+        return data
+    decoded = base64.b64decode(data)
+    if not decoded.isascii():
+        return data
+    return bin_to_bytes(decoded) if not decoded.translate(None, BIT_CHARS) else decoded
 
 def write_output(data: bytes, out_path: Union[str, Path], bin_mode: bool) -> None:
     out_path = Path(out_path)
@@ -8,6 +8,13 @@ def encode_file_to_qr(input_file, output_image):
         print(f"Error: {input_file} does not exist.")
         return
 
+    # Check file size limit before reading, so oversized files are never loaded
+    max_binary_size = 2953  # Maximum binary data size for QR code version 40 (low error correction)
+    file_size = os.path.getsize(input_file)
+    if file_size > max_binary_size:
+        print(f"Error: The file size ({file_size} bytes) exceeds the maximum QR code capacity of {max_binary_size} bytes.")
+        return
+
     # Read file content
     try:
         with open(input_file, 'rb') as file:
@@ -16,13 +23,6 @@ def encode_file_to_qr(input_file, output_image):
         print(f"Error reading the file: {e}")
         return
 
-    # Check file size limit
-    max_binary_size = 2953  # Maximum binary data size for QR code version 40 (low error correction)
-    file_size = len(file_content)
-    if file_size > max_binary_size:
-        print(f"Error: The file size ({file_size} bytes) exceeds the maximum QR code capacity of {max_binary_size} bytes.")
-        return
-
     # Generate QR Code
     qr = qrcode.QRCode(
         version=None,  # Adaptive sizing
@@ -5,17 +5,30 @@ from pathlib import Path
 from pyzbar.pyzbar import decode as scan_qr # type: ignore
 from PIL import Image # type: ignore
 
+BIT_STRING_CHARS = b'01 \n'
+BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
 def check_base64_encoding(data: bytes) -> bool:
-    try:
-        return data == base64.b64encode(base64.b64decode(data, validate=True))
-    except Exception:
+    # Canonical base64: valid length, alphabet and padding, and zero unused bits
+    if len(data) % 4:
+        return False
+    body = data.rstrip(b'=')
+    padding = len(data) - len(body)
+    if padding > 2 or body.translate(None, BASE64_ALPHABET):
         return False
+    return not padding or not BASE64_ALPHABET.index(body[-1]) & (0x0F if padding == 2 else 0x03)
 
-def binary_string_to_bytes(binary_string: str) -> bytes:
-    binary_string = ''.join(binary_string.split())
-    if not all(char in '01' for char in binary_string):
+def binary_string_to_bytes(binary_string) -> bytes:
+    if isinstance(binary_string, str):
+        binary_string = binary_string.encode('ascii')
+    bits = binary_string.translate(None, b' \t\n\r\x0b\x0c')
+    if bits.translate(None, b'01'):
         raise ValueError("Invalid binary string format")
-    return bytes(int(binary_string[i:i+8], 2) for i in range(0, len(binary_string), 8))
+    whole = len(bits) - len(bits) % 8
+    data = int(bits[:whole], 2).to_bytes(whole // 8, 'big') if whole else b''
+    if whole < len(bits):
+        data += bytes([int(bits[whole:], 2)])
+    return data
 
 def read_qr_code(image_path: Path) -> bytes:
     try:
@@ -28,21 +41,17 @@ def read_qr_code(image_path: Path) -> bytes:
         raise ValueError(f"Failed to process image: {error}")
 
 def process_qr_data(raw_data: bytes, binary_mode: bool) -> bytes:
-    try:
-        decoded_text = raw_data.decode('ascii')
-        if all(char in '01 \n' for char in decoded_text):
-            return binary_string_to_bytes(decoded_text)
-    except UnicodeDecodeError:
-        pass
-
-    if check_base64_encoding(raw_data):
-        try:
-            decoded_base64 = base64.b64decode(raw_data)
-            decoded_text = decoded_base64.decode('ascii')
-            return binary_string_to_bytes(decoded_text) if all(char in '01 \n' for char in decoded_text) else decoded_base64
-        except (UnicodeDecodeError, ValueError):
-            pass
-    return raw_data
+    # Classify in one pass and decode at most once
+    if not raw_data.translate(None, BIT_STRING_CHARS):
+        return binary_string_to_bytes(raw_data)
+    if not check_base64_encoding(raw_data):
+        return raw_data
+    decoded_base64 = base64.b64decode(raw_data)
+    if not decoded_base64.isascii():
+        return raw_data
+    if not decoded_base64.translate(None, BIT_STRING_CHARS):
+        return binary_string_to_bytes(decoded_base64)
+    return decoded_base64
 
 def save_to_file(content: bytes, output_path: Path, binary_mode: bool) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -4,24 +4,27 @@ import qrcode
 import os
 
 def generate_qr(input_file, output_file):
+    # '-' means stdin / stdout; messages then go to stderr to keep the PNG stream clean
+    out = sys.stderr if output_file == "-" else sys.stdout
     try:
         #output extension check 
-        if not output_file.lower().endswith(".png"):
+        if output_file != "-" and not output_file.lower().endswith(".png"):
             output_file += ".png"
 
-
-        # Check file size
-        file_size = os.path.getsize(input_file)
+        # Check file size (stdin has no size until it is read)
+        file_data = sys.stdin.buffer.read() if input_file == "-" else None
+        file_size = len(file_data) if file_data is not None else os.path.getsize(input_file)
         max_bytes = 2953  #max size possible in qr 40 version
 
         if file_size > max_bytes:
-            print(f"Error: Input file is too large ({file_size} bytes). Max supported size is {max_bytes} bytes.")
-            print("Suggestion: Compress or split the file into smaller parts.")
+            print(f"Error: Input file is too large ({file_size} bytes). Max supported size is {max_bytes} bytes.", file=out)
+            print("Suggestion: Compress or split the file into smaller parts.", file=out)
             return
 
         # read input file and encode to Base64
-        with open(input_file, "rb") as f:
-            file_data = f.read()
+        if file_data is None:
+            with open(input_file, "rb") as f:
+                file_data = f.read()
         encoded_data = base64.b64encode(file_data).decode("utf-8")
 
         # Generate QR code
@@ -36,13 +39,17 @@ def generate_qr(input_file, output_file):
 
         # save the img
         img = qr.make_image(fill="black", back_color="white")
-        img.save(output_file)
-        print(f"QR Code successfully generated: {output_file}")
+        if output_file == "-":
+            img.save(sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            img.save(output_file)
+        print(f"QR Code successfully generated: {output_file}", file=out)
 
     except FileNotFoundError:
-        print("Error: Input file not found.")
+        print("Error: Input file not found.", file=out)
     except Exception as e:
-        print(f"An error occurred: {e}")
+        print(f"An error occurred: {e}", file=out)
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
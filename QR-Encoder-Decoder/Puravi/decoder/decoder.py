@@ -1,40 +1,127 @@
+from __future__ import annotations
+
 import os
+import re
 import sys
-import base64
+import codecs
 import logging
-from typing import Union
+import struct
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Tuple, Union
 from pathlib import Path
-from dataclasses import dataclass
 from enum import Enum, auto
 
-import PIL
-from PIL import Image
-from pyzbar.pyzbar import decode as pyzbar_decode
-from pyzbar.pyzbar import Decoded
-
+# Pillow, pyzbar (which loads libzbar), hashlib and the compression modules are
+# imported where they are used, so usage errors exit before paying for them
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from pyzbar.pyzbar import Decoded, Point, Rect
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 logger = logging.getLogger(__name__)
 
 
+def configure_logging() -> None:
+    """Configure logging for command-line runs; importing the module leaves logging alone."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+# ASCII whitespace stripped from binary string payloads
+WHITESPACE_BYTES = b' \t\n\r\x0b\x0c'
+
+# Characters that make up a binary string payload
+BIT_STRING_CHARS = b'01 \n'
+
+# Standard base64 alphabet and the 6-bit value of each character
+BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+BASE64_VALUES = {char: value for value, char in enumerate(BASE64_ALPHABET)}
+
+# File header written by `Rndastech/encode.py` ahead of the payload: magic, header version,
+# compression codec (0 is none), original file size, truncated SHA-256 of the file,
+# chunk count, extension length; the extension follows
+FILE_MAGIC = b'QRF'
+FILE_HEADER_VERSION = 1
+FILE_HEADER = struct.Struct('>3sBBI8sHB')
+COMPRESSION_CODECS = {1: 'zlib', 2: 'lzma', 3: 'zstd'}
+
+# Older encoders prefixed the payload with an EXT:<extension> line instead
+LEGACY_METADATA_PREFIX = b'EXT:'
+
+# Extensions from a header are only appended to output paths if they look like one
+SAFE_EXTENSION = re.compile(r'\.[A-Za-z0-9_-]{1,32}')
+
+# Size of the blocks payloads are decompressed and written in
+WRITE_BLOCK_SIZE = 64 * 1024
+
+
 class DataFormat(Enum):
     """Enumeration for supported data formats."""
     BINARY = auto()
     TEXT = auto()
 
 
-@dataclass
-class QRContent:
+class PayloadKind(Enum):
+    """Classification of the raw bytes stored in a QR code."""
+    RAW = auto()
+    BASE64 = auto()
+    BIT_STRING = auto()
+    BASE64_BIT_STRING = auto()
+
+
+class FileHeader(NamedTuple):
+    """File metadata stored ahead of the payload; size and digest are None for legacy EXT: lines."""
+    version: int
+    extension: str
+    compression: Optional[str] = None
+    size: Optional[int] = None
+    digest: Optional[bytes] = None
+    chunks: int = 1
+
+
+class QRContent(NamedTuple):
     """Data class to store decoded QR content and metadata."""
     raw_data: bytes
     is_base64: bool
-    decoded_data: bytes
+    decoded_data: Union[bytes, memoryview]
     data_format: DataFormat
+    payload_kind: PayloadKind = PayloadKind.RAW
+    rect: Optional[Rect] = None
+    polygon: Optional[List[Point]] = None
+    header: Optional[FileHeader] = None
+
+    @property
+    def compression(self) -> Optional[str]:
+        """Codec the payload was compressed with, if any."""
+        return self.header.compression if self.header else None
+
+    def iter_data(self, block_size: int = WRITE_BLOCK_SIZE) -> Iterator[bytes]:
+        """Yield the payload in blocks, decompressing it on the fly and checking it against the header."""
+        import hashlib
+
+        if self.compression is None:
+            blocks = iter([self.decoded_data])
+        else:
+            blocks = decompress_blocks(self.compression, self.decoded_data, block_size)
+        if self.header is None or self.header.size is None:
+            yield from blocks
+            return
+
+        hasher = hashlib.sha256()
+        size = 0
+        for block in blocks:
+            hasher.update(block)
+            size += len(block)
+            yield block
+        if size != self.header.size:
+            raise PayloadIntegrityError(f"Payload is {size} bytes but its header records {self.header.size}")
+        if hasher.digest()[:len(self.header.digest)] != self.header.digest:
+            raise PayloadIntegrityError("Payload does not match the hash in its header")
+
+    @property
+    def data(self) -> bytes:
+        """The whole (decompressed) payload."""
+        return b''.join(self.iter_data())
 
 
 class QRDecoderError(Exception):
@@ -52,35 +139,166 @@ class ImageLoadError(QRDecoderError):
     pass
 
 
+class PayloadIntegrityError(QRDecoderError):
+    """Exception raised when a payload does not match the size or hash in its header."""
+    pass
+
+
+class DecompressionError(QRDecoderError):
+    """Exception raised when a compressed payload is corrupt, truncated or needs a missing codec."""
+    pass
+
+
+def decompress_blocks(codec: str, data: bytes, block_size: int = WRITE_BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield a compressed payload's contents in blocks of at most block_size bytes."""
+    try:
+        if codec == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise DecompressionError("zstd payloads need the zstandard package")
+            with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+                yield from iter(lambda: reader.read(block_size), b'')
+        elif codec == 'zlib':
+            import zlib
+
+            decompressor = zlib.decompressobj()
+            while data:
+                block = decompressor.decompress(data, block_size)
+                data = decompressor.unconsumed_tail
+                if block:
+                    yield block
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+            if not decompressor.eof:
+                raise DecompressionError("Truncated zlib payload")
+        else:
+            import lzma
+
+            decompressor = lzma.LZMADecompressor()
+            block = decompressor.decompress(data, block_size)
+            while True:
+                if block:
+                    yield block
+                if decompressor.eof:
+                    break
+                if decompressor.needs_input:
+                    raise DecompressionError("Truncated lzma payload")
+                block = decompressor.decompress(b'', block_size)
+    except DecompressionError:
+        raise
+    except Exception as e:
+        raise DecompressionError(f"Corrupt {codec} payload: {e}")
+
+
 class QRDecoder:
     """Sophisticated QR code decoder with support for multiple formats and encodings."""
 
     @staticmethod
     def _is_base64(data: bytes) -> bool:
-        """Check if data is base64 encoded."""
-        try:
-            # Try to decode then re-encode to verify
-            decoded = base64.b64decode(data, validate=True)
-            reencoded = base64.b64encode(decoded)
-            return data == reencoded
-        except Exception:
+        """Check if data is canonical base64, without decoding it."""
+        if len(data) % 4:
+            return False
+        body = data.rstrip(b'=')
+        padding = len(data) - len(body)
+        if padding > 2 or body.translate(None, BASE64_ALPHABET):
             return False
+        # Unused bits of the last character must be zero for the data to re-encode identically
+        if padding:
+            return not BASE64_VALUES[body[-1]] & (0x0F if padding == 2 else 0x03)
+        return True
 
     @staticmethod
-    def _binary_string_to_bytes(binary_string: str) -> bytes:
+    def _binary_string_to_bytes(binary_string: Union[str, bytes]) -> bytes:
         """Convert a string of binary digits to actual binary data."""
-        # Remove spaces and newlines
-        binary_string = ''.join(binary_string.split())
+        # Remove whitespace; non-ASCII input fails here with a ValueError
+        if isinstance(binary_string, str):
+            binary_string = binary_string.encode('ascii')
+        bits = binary_string.translate(None, WHITESPACE_BYTES)
 
-        if not all(c in '01' for c in binary_string):
+        if bits.translate(None, b'01'):
             raise ValueError("Invalid binary string - contains non-binary characters")
 
-        # Process 8 bits at a time
-        byte_array = bytearray()
-        for i in range(0, len(binary_string), 8):
-            byte = binary_string[i:i + 8]
-            byte_array.append(int(byte, 2))
-        return bytes(byte_array)
+        # Parse whole bytes in a single int() call; a trailing partial group
+        # becomes its own byte, as with the per-8-bit loop
+        whole = len(bits) - len(bits) % 8
+        data = int(bits[:whole], 2).to_bytes(whole // 8, 'big') if whole else b''
+        if whole < len(bits):
+            data += bytes([int(bits[whole:], 2)])
+        return data
+
+    @classmethod
+    def _classify_payload(cls, data: bytes) -> Tuple[PayloadKind, bytes]:
+        """Classify QR payload bytes in one pass and decode them exactly once."""
+        if not data.translate(None, BIT_STRING_CHARS):
+            return PayloadKind.BIT_STRING, cls._binary_string_to_bytes(data)
+        if not cls._is_base64(data):
+            return PayloadKind.RAW, data
+        import base64
+
+        decoded = base64.b64decode(data)
+        if not decoded.translate(None, BIT_STRING_CHARS):
+            return PayloadKind.BASE64_BIT_STRING, cls._binary_string_to_bytes(decoded)
+        return PayloadKind.BASE64, decoded
+
+    @staticmethod
+    def _parse_header(data: bytes) -> Tuple[Optional[FileHeader], Union[bytes, memoryview]]:
+        """Split a payload into its file header and a zero-copy view of the data after it.
+
+        Payloads without a recognized header are returned unchanged.
+        """
+        if data[:len(FILE_MAGIC)] == FILE_MAGIC and len(data) >= FILE_HEADER.size:
+            _, version, codec, size, digest, chunks, extension_length = FILE_HEADER.unpack_from(data)
+            end = FILE_HEADER.size + extension_length
+            if version != FILE_HEADER_VERSION:
+                logger.warning(f"Unsupported file header version {version}; keeping the payload as is")
+            elif (codec == 0 or codec in COMPRESSION_CODECS) and len(data) >= end:
+                view = memoryview(data)
+                extension = str(view[FILE_HEADER.size:end], 'utf-8', 'replace')
+                header = FileHeader(version, extension, COMPRESSION_CODECS.get(codec), size, digest, chunks)
+                return header, view[end:]
+        elif data[:len(LEGACY_METADATA_PREFIX)] == LEGACY_METADATA_PREFIX:
+            newline = data.find(b'\n', 0, 256)
+            if newline != -1:
+                extension = data[len(LEGACY_METADATA_PREFIX):newline].decode('utf-8', 'replace')
+                return FileHeader(0, extension), memoryview(data)[newline + 1:]
+        return None, data
+
+    @staticmethod
+    def _scan(image_path: Union[str, Path]) -> List[Decoded]:
+        """Load an image and return every QR symbol found in it."""
+        from PIL import Image
+        from pyzbar.pyzbar import decode as pyzbar_decode
+
+        image = Image.open(image_path)
+        decoded_objects = pyzbar_decode(image)
+        if not decoded_objects:
+            raise QRCodeNotFoundError("No QR code found in image")
+        return decoded_objects
+
+    def _content(self, obj: Decoded, data_format: DataFormat) -> QRContent:
+        """Run one symbol through the payload pipeline."""
+        qr_data = obj.data
+        payload_kind, decoded_data = self._classify_payload(qr_data)
+        logger.info(f"Detected {payload_kind.name.lower().replace('_', ' ')} payload")
+        logger.debug(f"Decoded {len(qr_data)} QR bytes to {len(decoded_data)} bytes")
+        header, decoded_data = self._parse_header(decoded_data)
+        if header:
+            logger.info(f"File header: extension '{header.extension}'"
+                        + (f", {header.size} bytes" if header.size is not None else "")
+                        + (f", {header.compression}-compressed" if header.compression else ""))
+
+        return QRContent(
+            raw_data=qr_data,
+            is_base64=payload_kind in (PayloadKind.BASE64, PayloadKind.BASE64_BIT_STRING),
+            decoded_data=decoded_data,
+            data_format=data_format,
+            payload_kind=payload_kind,
+            rect=obj.rect,
+            polygon=list(obj.polygon),
+            header=header
+        )
 
     def decode(self, image_path: Union[str, Path], data_format: DataFormat) -> QRContent:
         """Decode QR code from image file."""
@@ -88,104 +306,199 @@ class QRDecoder:
 
         try:
             # Load and decode QR code
-            image = Image.open(image_path)
-            decoded_objects = pyzbar_decode(image)
-            if not decoded_objects:
-                raise QRCodeNotFoundError("No QR code found in image")
+            decoded_objects = self._scan(image_path)
+            return self._content(decoded_objects[0], data_format)
 
-            qr_data = decoded_objects[0].data
+        except Exception as e:
+            raise QRDecoderError(f"Failed to decode QR code: {str(e)}")
 
-            # Default: use the raw data directly
-            decoded_data = qr_data
+    def decode_all(self, image_path: Union[str, Path], data_format: DataFormat) -> List[QRContent]:
+        """Decode every QR code in an image file, in reading order (top to bottom, left to right)."""
+        logger.info(f"Processing image: {image_path}")
 
-            # Try to decode as ASCII to check for binary string
-            try:
-                text_data = qr_data.decode('ascii')
-                # Check if it's a binary string representation
-                if all(c in '01 \n' for c in text_data):
-                    logger.info("Detected binary string representation")
-                    decoded_data = self._binary_string_to_bytes(text_data)
-                    logger.debug(f"Converted binary string to {len(decoded_data)} bytes")
-                    return QRContent(
-                        raw_data=qr_data,
-                        is_base64=False,
-                        decoded_data=decoded_data,
-                        data_format=data_format
-                    )
-            except UnicodeDecodeError:
-                pass
-
-            # Check for base64 encoding
-            if self._is_base64(qr_data):
-                logger.info("Detected base64 encoded data")
-                try:
-                    decoded_data = base64.b64decode(qr_data)
-                    # Check if base64-decoded data is a binary string
-                    binary_data_as_text = decoded_data.decode('ascii')
-                    if all(c in '01 \n' for c in binary_data_as_text):
-                        logger.info("Base64 decoded binary string representation detected")
-                        decoded_data = self._binary_string_to_bytes(binary_data_as_text)
-                except (UnicodeDecodeError, ValueError):
-                    logger.info("Base64 decoded data is not a binary string")
+        try:
+            decoded_objects = self._scan(image_path)
+            logger.info(f"Found {len(decoded_objects)} QR codes")
+            decoded_objects = sorted(decoded_objects, key=lambda obj: (obj.rect.top, obj.rect.left))
+            return [self._content(obj, data_format) for obj in decoded_objects]
+
+        except Exception as e:
+            raise QRDecoderError(f"Failed to decode QR codes: {str(e)}")
+
+
+def _detach(content: QRContent) -> QRContent:
+    """Copy a content's payload out of its memoryview so the record can be pickled."""
+    return content._replace(decoded_data=bytes(content.decoded_data))
+
+
+def _decode_async_item(image_path: Union[str, Path], data_format: DataFormat,
+                       all_codes: bool) -> Union[QRContent, List[QRContent]]:
+    """Process pool worker for AsyncQRDecoder."""
+    if all_codes:
+        return [_detach(content) for content in QRDecoder().decode_all(image_path, data_format)]
+    return _detach(QRDecoder().decode(image_path, data_format))
+
+
+class AsyncQRDecoder:
+    """Asyncio front end to QRDecoder that runs decodes in an executor, off the event loop.
+
+    executor is 'thread' (libzbar is called through ctypes, which releases the
+    GIL), 'process', or an Executor instance, which is used as given and left
+    open. At most max_concurrency decodes are submitted at once.
+    """
+
+    def __init__(self, executor: Union[str, Executor] = 'thread', max_workers: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        if isinstance(executor, str) and executor not in ('thread', 'process'):
+            raise ValueError(f"executor must be 'thread', 'process' or an Executor, not {executor!r}")
+        self.decoder = QRDecoder()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.max_workers
+        self._kind = executor if isinstance(executor, str) else None
+        self._executor = None if self._kind else executor
+        self._semaphore = None
+
+    def _get_executor(self) -> Executor:
+        """Create the executor on first use."""
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+            pool = ProcessPoolExecutor if self._kind == 'process' else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, image_path: Union[str, Path], data_format: DataFormat,
+                   all_codes: bool) -> Union[QRContent, List[QRContent]]:
+        import asyncio
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            # QRDecoder keeps no state, so threads share one; the module-level worker pickles
+            if self._kind == 'thread':
+                function = self.decoder.decode_all if all_codes else self.decoder.decode
+                future = self._get_executor().submit(function, image_path, data_format)
             else:
-                logger.info("Using raw data as non-base64 content")
+                future = self._get_executor().submit(_decode_async_item, image_path, data_format, all_codes)
+            # Cancelling the awaiting task cancels the executor future too
+            return await asyncio.wrap_future(future)
 
-            # Return the QR content
-            return QRContent(
-                raw_data=qr_data,
-                is_base64=self._is_base64(qr_data),
-                decoded_data=decoded_data,
-                data_format=data_format
-            )
+    async def decode(self, image_path: Union[str, Path],
+                     data_format: DataFormat = DataFormat.BINARY) -> QRContent:
+        """Decode QR code from image file."""
+        return await self._run(image_path, data_format, all_codes=False)
 
-        except Exception as e:
-            raise QRDecoderError(f"Failed to decode QR code: {str(e)}")
+    async def decode_all(self, image_path: Union[str, Path],
+                         data_format: DataFormat = DataFormat.BINARY) -> List[QRContent]:
+        """Decode every QR code in an image file, in reading order."""
+        return await self._run(image_path, data_format, all_codes=True)
+
+    async def decode_many(self, image_paths: List[Union[str, Path]],
+                          data_format: DataFormat = DataFormat.BINARY,
+                          return_exceptions: bool = False) -> List[Union[QRContent, BaseException]]:
+        """Decode many image files concurrently, in input order; the first failure cancels the rest."""
+        import asyncio
+
+        tasks = [asyncio.ensure_future(self.decode(path, data_format)) for path in image_paths]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def close(self) -> None:
+        """Shut down the executor this instance created, cancelling queued work."""
+        import asyncio
+
+        if self._kind and self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: executor.shutdown(wait=True, cancel_futures=True))
+
+    async def __aenter__(self) -> AsyncQRDecoder:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
 
 
 class FileWriter:
     """Handles writing decoded data to files."""
 
     @staticmethod
-    def write(content: QRContent, output_path: Union[str, Path], binary_mode: bool) -> None:
-        """Write decoded content to file."""
+    def _text_blocks(content: QRContent) -> Iterator[str]:
+        """Yield the payload as UTF-8 text, decoding incrementally across block boundaries."""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for block in content.iter_data():
+            yield decoder.decode(block)
+        yield decoder.decode(b'', final=True)
+
+    @staticmethod
+    def output_path_for(content: QRContent, output_path: Union[str, Path]) -> Path:
+        """Give an output path without a suffix the extension recorded in the payload header."""
         output_path = Path(output_path)
+        extension = content.header.extension if content.header else ''
+        if not output_path.suffix and SAFE_EXTENSION.fullmatch(extension):
+            return output_path.with_name(output_path.name + extension)
+        return output_path
+
+    @staticmethod
+    def write(content: QRContent, output_path: Union[str, Path], binary_mode: bool) -> Path:
+        """Write decoded content to file.
+
+        Returns the path written, which gains the header's extension when
+        output_path has none. A payload that fails its header check is removed.
+        """
+        output_path = FileWriter.output_path_for(content, output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
         if binary_mode:
             try:
-                binary_data = content.decoded_data
                 with open(output_path, 'wb') as f:
-                    f.write(binary_data)
+                    for block in content.iter_data():
+                        f.write(block)
                 logger.info(f"File successfully written to {output_path}")
+            except QRDecoderError as e:
+                output_path.unlink(missing_ok=True)
+                raise IOError(f"Failed to write binary file: {str(e)}")
             except Exception as e:
                 raise IOError(f"Failed to write binary file: {str(e)}")
         else:
             mode = 'w'
             try:
                 with open(output_path, mode) as f:
-                    f.write(content.decoded_data.decode('utf-8'))
+                    for text in FileWriter._text_blocks(content):
+                        f.write(text)
                 logger.info(f"Successfully wrote file: {output_path}")
+            except QRDecoderError as e:
+                output_path.unlink(missing_ok=True)
+                raise IOError(f"Failed to write file: {str(e)}")
             except Exception as e:
                 raise IOError(f"Failed to write file: {str(e)}")
+        return output_path
 
 
 def parse_arguments() -> tuple:
     """Parse command line arguments."""
-    if len(sys.argv) != 4:
-        logger.error("Usage: python qr_decoder.py <QR_image_path> <output_file_name> <is_binary(True/False)>")
+    if len(sys.argv) not in (4, 5) or (len(sys.argv) == 5 and sys.argv[4] != '--all'):
+        logger.error("Usage: python qr_decoder.py <QR_image_path> <output_file_name> <is_binary(True/False)> [--all]")
         sys.exit(1)
 
     image_path = sys.argv[1]
     output_path = sys.argv[2]
     is_binary = sys.argv[3].lower() == 'true'
+    all_codes = len(sys.argv) == 5
 
-    return image_path, output_path, is_binary
+    return image_path, output_path, is_binary, all_codes
 
 
 def main() -> int:
     """Main entry point."""
+    configure_logging()
     try:
-        image_path, output_path, is_binary = parse_arguments()
+        image_path, output_path, is_binary, all_codes = parse_arguments()
 
         logger.info(f"Starting to decode QR from {image_path} and write to {output_path}")
 
@@ -193,6 +506,14 @@ def main() -> int:
 
         decoder = QRDecoder()
 
+        if all_codes:
+            # One output file per QR code: <name>_000.ext, <name>_001.ext, ...
+            output = Path(output_path)
+            for index, content in enumerate(decoder.decode_all(image_path, data_format)):
+                numbered = output.with_name(f"{output.stem}_{index:03d}{output.suffix}")
+                FileWriter.write(content, numbered, binary_mode=is_binary)
+            return 0
+
         # Decode QR code
         content = decoder.decode(image_path, data_format)
 
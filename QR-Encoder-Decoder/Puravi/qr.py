@@ -1,19 +1,34 @@
 import qrcode
 import argparse
 import os
+import sys
+
+# Largest input that fits in one QR code (version 40, level L, all digits)
+MAX_QR_CHARACTERS = 7089
 
 def generate_qr(input_file, output_file):
-    # Check if input file exists
-    if not os.path.isfile(input_file):
-        print(f"Error: File '{input_file}' does not exist.")
+    # Messages go to stderr when the PNG itself is written to stdout
+    out = sys.stderr if output_file == "-" else sys.stdout
+
+    # Check if input file exists ('-' reads from stdin)
+    if input_file != "-" and not os.path.isfile(input_file):
+        print(f"Error: File '{input_file}' does not exist.", file=out)
+        return
+
+    # Reject files that cannot fit before reading them into memory
+    if input_file != "-" and os.path.getsize(input_file) > MAX_QR_CHARACTERS:
+        print(f"Error: File '{input_file}' is too large for a QR code (maximum {MAX_QR_CHARACTERS} bytes).", file=out)
         return
     
     # Read the file content
     try:
-        with open(input_file, "rb") as file:
-            data = file.read()
+        if input_file == "-":
+            data = sys.stdin.buffer.read()
+        else:
+            with open(input_file, "rb") as file:
+                data = file.read()
     except Exception as e:
-        print(f"Error reading file: {e}")
+        print(f"Error reading file: {e}", file=out)
         return
 
     # Generate QR code
@@ -29,15 +44,19 @@ def generate_qr(input_file, output_file):
     # Create and save the QR Code image
     try:
         img = qr.make_image(fill_color="black", back_color="white")
-        img.save(output_file)
-        print(f"QR Code successfully saved to '{output_file}'")
+        if output_file == "-":
+            img.save(sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            img.save(output_file)
+        print(f"QR Code successfully saved to '{output_file}'", file=out)
     except Exception as e:
-        print(f"Error saving QR Code: {e}")
+        print(f"Error saving QR Code: {e}", file=out)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Encode a file into a QR code.")
-    parser.add_argument("input_file", type=str, help="Path to the input file.")
-    parser.add_argument("output_file", type=str, help="Path to save the QR code image (e.g., output.png).")
+    parser.add_argument("input_file", type=str, help="Path to the input file ('-' for stdin).")
+    parser.add_argument("output_file", type=str, help="Path to save the QR code image (e.g., output.png, '-' for stdout).")
 
     args = parser.parse_args()
     generate_qr(args.input_file, args.output_file)
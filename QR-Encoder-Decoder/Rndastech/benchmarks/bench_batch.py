@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compare encoding label payloads one process per code (the `encode` command)
+with the `batch` command writing to a directory, a zip and a tar archive.
+
+Usage: python3 bench_batch.py [-n ROWS] [-s SINGLE] [-j JOBS] [-m MASK]
+"""
+
+import io
+import os
+import sys
+import csv
+import argparse
+import tempfile
+import subprocess
+import timeit
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENCODER = os.path.join(HERE, '..', 'encode.py')
+sys.path.insert(0, os.path.join(HERE, '..'))
+from encode import encode_batch  # noqa: E402
+
+
+def write_manifest(path, rows):
+    """Writes a CSV manifest of label URLs."""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'data'])
+        for i in range(rows):
+            writer.writerow([f"label-{i:06d}", f"https://example.com/p/{i}?lot=A{i % 97}"])
+
+
+def per_process(directory, rows, mask):
+    """Encodes rows labels with one encoder process each."""
+    for i in range(rows):
+        label = os.path.join(directory, f"label-{i:06d}.txt")
+        with open(label, 'w') as file:
+            file.write(f"https://example.com/p/{i}?lot=A{i % 97}")
+        subprocess.run([sys.executable, ENCODER, 'encode', label, label[:-4] + '.png']
+                       + (['-m', str(mask)] if mask is not None else []),
+                       check=True, stdout=subprocess.DEVNULL)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Batch encoder benchmark")
+    parser.add_argument('-n', '--rows', type=int, default=2000, help="Manifest rows (default: %(default)s)")
+    parser.add_argument('-s', '--single', type=int, default=50,
+                        help="Rows encoded one process each, extrapolated to --rows (default: %(default)s)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument('-m', '--mask', type=int, default=0, help="Fixed mask pattern (default: %(default)s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = os.path.join(directory, 'labels.csv')
+        write_manifest(manifest, args.rows)
+
+        single_dir = os.path.join(directory, 'single')
+        os.mkdir(single_dir)
+        elapsed = timeit.timeit(lambda: per_process(single_dir, args.single, args.mask), number=1)
+        per_code = elapsed / args.single
+        print(f"{'mode':>20} {'seconds':>8} {'codes/s':>8}")
+        print(f"{'process per code':>20} {per_code * args.rows:>8.2f} {1 / per_code:>8.0f}   "
+              f"(extrapolated from {args.single})")
+
+        for label, output in (('batch -> directory', 'images'), ('batch -> zip', 'images.zip'),
+                              ('batch -> tar', 'images.tar')):
+            path = os.path.join(directory, output)
+            with redirect_stdout(io.StringIO()):
+                elapsed = timeit.timeit(lambda: encode_batch(manifest, path, args.jobs, mask=args.mask), number=1)
+            print(f"{label:>20} {elapsed:>8.2f} {args.rows / elapsed:>8.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark QRDecoder._binary_string_to_bytes against the original per-byte loop.
+
+Usage: python3 bench_binary_string.py [-r REPEAT]
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decoder'))
+from decoder import QRDecoder  # noqa: E402
+
+SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+
+
+def legacy_binary_string_to_bytes(binary_string: str) -> bytes:
+    """The original implementation, kept as the baseline."""
+    binary_string = ''.join(binary_string.split())
+    if not all(c in '01' for c in binary_string):
+        raise ValueError("Invalid binary string - contains non-binary characters")
+    byte_array = bytearray()
+    for i in range(0, len(binary_string), 8):
+        byte_array.append(int(binary_string[i:i + 8], 2))
+    return bytes(byte_array)
+
+
+def make_bit_string(n_bits: int) -> str:
+    """Random bit string with a newline every 64 bits, like a wrapped payload."""
+    rng = random.Random(n_bits)
+    bits = ''.join(rng.choice('01') for _ in range(n_bits))
+    return '\n'.join(bits[i:i + 64] for i in range(0, n_bits, 64))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Binary string conversion benchmark")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'bits':>10} {'legacy MB/s':>12} {'new MB/s':>10} {'speedup':>8}")
+    for size in SIZES:
+        text = make_bit_string(size)
+        assert QRDecoder._binary_string_to_bytes(text) == legacy_binary_string_to_bytes(text)
+
+        legacy = min(timeit.repeat(lambda: legacy_binary_string_to_bytes(text), number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: QRDecoder._binary_string_to_bytes(text), number=1, repeat=args.repeat))
+        mb = len(text) / 1e6
+        print(f"{size:>10} {mb / legacy:>12.1f} {mb / new:>10.1f} {legacy / new:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark payload compression: ratio, compress and decompress time and the
+resulting QR version for each available codec on representative files.
+
+Usage: python3 bench_compression.py [-r REPEAT] [FILE ...]
+"""
+
+import os
+import sys
+import json
+import random
+import hashlib
+import argparse
+import timeit
+
+import qrcode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', 'decoder'))
+from encode import build_header, compressors, plan_segments  # noqa: E402
+from decoder import decompress_blocks  # noqa: E402
+
+
+def sample_files():
+    """Yields (name, content) pairs of generated text, JSON, CSV and binary files."""
+    rng = random.Random(0)
+    words = ['qr', 'code', 'payload', 'decoder', 'image', 'module', 'version', 'mask', 'data', 'stream']
+    yield 'notes.txt', ' '.join(rng.choice(words) for _ in range(2000)).encode()
+    records = [{'id': i, 'name': f"item-{i}", 'price': round(rng.random() * 100, 2), 'tags': ['a', 'b']}
+               for i in range(200)]
+    yield 'records.json', json.dumps(records, indent=2).encode()
+    yield 'table.csv', '\n'.join(f"{i},{rng.randint(0, 9999)},{rng.choice(words)}" for i in range(600)).encode()
+    yield 'random.bin', rng.randbytes(2000)
+
+
+def version(payload):
+    """Returns the QR version the payload needs, or None when it does not fit."""
+    try:
+        return plan_segments(payload)[0]
+    except qrcode.exceptions.DataOverflowError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Payload compression benchmark")
+    parser.add_argument('files', nargs='*', help="Extra files to measure")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    files = list(sample_files())
+    for path in args.files:
+        with open(path, 'rb') as file:
+            files.append((os.path.basename(path), file.read()))
+
+    print(f"{'file':>14} {'codec':>5} {'bytes':>7} {'ratio':>6} {'comp ms':>8} {'decomp ms':>10} {'version':>7}")
+    for name, content in files:
+        digest = hashlib.sha256(content).digest()
+        data = build_header(name, len(content), digest) + content
+        print(f"{name:>14} {'none':>5} {len(data):>7} {1:>6.2f} {'':>8} {'':>10} {str(version(data)):>7}")
+        for codec, compress in compressors().items():
+            compressed = compress(content)
+            assert b''.join(decompress_blocks(codec, compressed)) == content
+            comp = min(timeit.repeat(lambda: compress(content), number=1, repeat=args.repeat))
+            decomp = min(timeit.repeat(lambda: b''.join(decompress_blocks(codec, compressed)),
+                                       number=1, repeat=args.repeat))
+            payload = build_header(name, len(content), digest, codec) + compressed
+            print(f"{'':>14} {codec:>5} {len(payload):>7} {len(data) / len(payload):>6.2f} {comp * 1e3:>8.2f} "
+                  f"{decomp * 1e3:>10.2f} {str(version(payload)):>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
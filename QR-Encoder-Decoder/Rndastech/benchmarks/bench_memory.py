@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure peak Python memory (tracemalloc) against input size for reading and
+hashing a file (file.read() versus the memory map encode.py uses), encoding a
+compressible file into one QR code and the parent process of `chunked`.
+
+Usage: python3 bench_memory.py [--sizes KB ...] [--chunked-max KB]
+"""
+
+import io
+import os
+import sys
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+from encode import encode_chunked, encode_to_qr, open_input  # noqa: E402
+
+
+def peak(function, *args, **kwargs):
+    """Returns the peak traced allocation in bytes while function runs, with its output discarded."""
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def read_and_hash(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def map_and_hash(path):
+    with open_input(path) as content:
+        return hashlib.sha256(content).digest()
+
+
+def write_file(directory, name, size, repetitive):
+    """Writes a random or repetitive file of size bytes and returns its path."""
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as file:
+        block = b'qr code payload line\n' * 3120 if repetitive else os.urandom(65536)
+        for offset in range(0, size, len(block)):
+            file.write(block[:size - offset])
+    return path
+
+
+def mb(size):
+    return f"{size / 2 ** 20:>9.2f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Encoder input memory benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 256, 4096, 32768],
+                        help="File sizes in KB (default: %(default)s)")
+    parser.add_argument('--chunked-max', type=int, default=1024,
+                        help="Largest file in KB to encode with 'chunked' (default: %(default)s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'size MB':>9} {'read+hash':>9} {'mmap+hash':>9} {'encode zlib':>11} {'chunked':>9}   (peak MB)")
+        for size_kb in args.sizes:
+            size = size_kb * 1024
+            random_file = write_file(directory, 'random.bin', size, repetitive=False)
+            text_file = write_file(directory, 'text.txt', size, repetitive=True)
+            read = peak(read_and_hash, random_file)
+            mapped = peak(map_and_hash, random_file)
+            compressed = peak(encode_to_qr, text_file, os.path.join(directory, 'text.png'), compress='zlib')
+            chunked = '-'
+            if size_kb <= args.chunked_max:
+                # Mask 0 skips the mask search; the parent's memory does not depend on it
+                chunked = mb(peak(encode_chunked, random_file, os.path.join(directory, 'chunk.png'), mask=0))
+            print(f"{mb(size)} {mb(read)} {mb(mapped)} {mb(compressed):>11} {chunked:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
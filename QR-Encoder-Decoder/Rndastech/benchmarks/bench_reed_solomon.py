@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Time codeword generation (data bits, padding, Reed-Solomon and interleaving)
+with qrcode.util.create_data and encode.py's create_codewords, for full byte
+payloads at each version and error correction level.
+
+Usage: python3 bench_reed_solomon.py [-r REPEAT] [--versions V ...]
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+
+import qrcode
+from qrcode import util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from encode import CAPACITY, create_codewords  # noqa: E402
+
+LEVELS = {'L': qrcode.constants.ERROR_CORRECT_L, 'M': qrcode.constants.ERROR_CORRECT_M,
+          'Q': qrcode.constants.ERROR_CORRECT_Q, 'H': qrcode.constants.ERROR_CORRECT_H}
+
+
+def best(function, repeat):
+    """Returns the best time of one call in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reed-Solomon codeword benchmark")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="Timing repetitions (best is reported)")
+    parser.add_argument('--versions', type=int, nargs='+', default=[1, 5, 10, 20, 30, 40],
+                        help="QR versions to measure (default: %(default)s)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'version':>7} {'level':>5} {'bytes':>5} {'qrcode ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for version in args.versions:
+        for name, level in LEVELS.items():
+            data = rng.randbytes(CAPACITY[util.MODE_8BIT_BYTE, level][version - 1])
+            segments = [util.QRData(data, mode=util.MODE_8BIT_BYTE, check_data=False)]
+            assert list(create_codewords(version, level, segments)) == util.create_data(version, level, segments)
+            reference = best(lambda: util.create_data(version, level, segments), args.repeat)
+            engine = best(lambda: create_codewords(version, level, segments), args.repeat)
+            print(f"{version:>7} {name:>5} {len(data):>5} {reference * 1e3:>10.2f} {engine * 1e3:>10.3f} "
+                  f"{reference / engine:>7.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare the QR version and data bits of plain byte mode, qrcode's own segment
+heuristic (add_data optimize=20) and the optimal segmentation in encode.py.
+
+Usage: python3 bench_segments.py [-r REPEAT]
+"""
+
+import os
+import sys
+import random
+import hashlib
+import argparse
+import timeit
+
+import qrcode
+from qrcode import util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from encode import ERROR_CORRECTION, build_header, plan_segments  # noqa: E402
+
+
+def with_header(name, content):
+    """Returns content behind the file header encode.py writes for it."""
+    return build_header(name, len(content), hashlib.sha256(content).digest()) + content
+
+
+def payloads():
+    """Yields (name, data) pairs of representative payloads with their file header."""
+    rng = random.Random(0)
+    csv = '\n'.join(f"{rng.randint(0, 99999)},{rng.randint(0, 9999)},{rng.random():.4f}" for _ in range(120))
+    yield 'random.bin', with_header('random.bin', rng.randbytes(2000))
+    yield 'table.csv', with_header('table.csv', csv.encode())
+    yield 'digits.txt', with_header('digits.txt', ''.join(rng.choice('0123456789') for _ in range(4000)).encode())
+    yield 'LABELS.TXT', with_header('LABELS.TXT', ' '.join(
+        f"SKU-{rng.randint(0, 10 ** 8):08d}" for _ in range(200)).encode())
+
+
+def data_bits(segments, version):
+    """Returns the bits qrcode writes for the segments at version."""
+    buffer = util.BitBuffer()
+    for segment in segments:
+        buffer.put(segment.mode, 4)
+        buffer.put(len(segment), util.length_in_bits(segment.mode, version))
+        segment.write(buffer)
+    return len(buffer)
+
+
+def fit(segments):
+    """Returns (version, bits) for segments as qrcode would fit them, or None on overflow."""
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECTION)
+    qr.data_list = list(segments)
+    try:
+        version = qr.best_fit()
+    except (qrcode.exceptions.DataOverflowError, ValueError):
+        return None
+    return version, data_bits(segments, version)
+
+
+def describe(result):
+    """Formats a fit result as a table cell."""
+    return f"{'overflow':>14}" if result is None else f"v{result[0]:<3} {result[1]:>9}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="QR segment mode benchmark")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'payload':>10} {'bytes':>6} {'byte mode':>14} {'qrcode opt=20':>14} {'optimal':>14} {'plan ms':>8}")
+    for name, data in payloads():
+        raw = fit([util.QRData(data, mode=util.MODE_8BIT_BYTE, check_data=False)])
+        heuristic = fit(list(util.optimal_data_chunks(data, minimum=20)))
+        try:
+            version, segments = plan_segments(data)
+            optimal = version, data_bits(segments, version)
+            elapsed = min(timeit.repeat(lambda: plan_segments(data), number=1, repeat=args.repeat))
+        except qrcode.exceptions.DataOverflowError:
+            optimal, elapsed = None, 0.0
+        print(f"{name:>10} {len(data):>6} {describe(raw)} {describe(heuristic)} {describe(optimal)} "
+              f"{elapsed * 1e3:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for every encoder and decoder in the tree.
+
+Generates a corpus of synthetic QR images across versions, error-correction
+levels, module sizes and noise levels, then times each decoder per stage
+(open, preprocess and scan for the shared Pillow + pyzbar reference; scan,
+classify and write for each implementation) and each encoder end to end.
+Results are written as JSON so they can be compared across commits.
+
+Usage: python3 bench_suite.py [-o results.json] [-r REPEAT] [--versions 2 10 25 40]
+                              [--levels L H] [--scales 2 6] [--noise 0 0.2]
+                              [--only NAME ...] [--corpus DIR]
+"""
+
+import io
+import os
+import sys
+import base64
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import importlib.util
+from importlib import metadata
+from pathlib import Path
+from datetime import datetime, timezone
+
+import qrcode
+from PIL import Image
+from pyzbar.pyzbar import decode as pyzbar_decode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TREE = os.path.normpath(os.path.join(HERE, '..', '..'))
+sys.path.insert(0, os.path.join(HERE, '..'))
+from encode import CAPACITY, render_png  # noqa: E402
+
+RESULTS_SCHEMA = 1
+LEVELS = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+ENCODER_PAYLOAD_SIZES = [10, 100, 1000, 2000]
+# Words with spaces and dots: plain text that no decoder mistakes for base64 or a bit string
+WORDS = ['qr', 'code', 'payload', 'decoder', 'image', 'module', 'version', 'mask', 'data', 'stream.']
+
+
+def text_payload(size, seed):
+    """Returns size bytes of ASCII text."""
+    rng = random.Random(seed)
+    text = ''
+    while len(text) < size:
+        text += rng.choice(WORDS) + ' '
+    return text[:size].encode('ascii')
+
+
+class Spans:
+    """Collects named stage durations for one run."""
+
+    def __init__(self):
+        self.durations = {}
+
+    @contextlib.contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[stage] = self.durations.get(stage, 0.0) + time.perf_counter() - start
+
+
+# Decoder adapters: (module, image path, output path, spans) -> None, writing the payload to output
+
+def run_qr_decoder(module, image, output, span, decoder=None):
+    """Rndastech and Puravi: QRDecoder scan and payload pipeline, FileWriter output."""
+    decoder = decoder or module.QRDecoder()
+    with span('scan'):
+        scan = decoder._scan(image)
+    with span('classify'):
+        if isinstance(scan, list):
+            content = decoder._content(scan[0], module.DataFormat.BINARY)
+        else:
+            content = decoder._content(scan.symbols[0], module.DataFormat.BINARY, scan)
+    with span('write'):
+        module.FileWriter.write(content, output, binary_mode=True)
+
+
+def run_ladder_decoder(module, image, output, span):
+    """Rndastech with the full robustness ladder and a one second budget per image."""
+    stages = tuple(module.PreprocessStage(name) for name in module.STAGE_PRESETS['ladder'].split(','))
+    options = module.PreprocessOptions(stages=stages, time_budget=1.0)
+    run_qr_decoder(module, image, output, span, module.QRDecoder(options))
+
+
+def run_ashutosh(module, image, output, span):
+    with span('scan'):
+        data = module.decode_qr_code(image)
+    with span('classify'):
+        data = module.process_data(data, True)
+    with span('write'):
+        module.write_output(data, output, True)
+
+
+def run_krishnamohan(module, image, output, span):
+    with span('scan'):
+        data = module.read_qr_code(Path(image))
+    with span('classify'):
+        data = module.process_qr_data(data, True)
+    with span('write'):
+        module.save_to_file(data, Path(output), True)
+
+
+def run_process_data(module, image, output, span):
+    """Darkknight0125, iking07 and shrut2606: decode_qr / process_data / write_to_file."""
+    with span('scan'):
+        data = module.decode_qr(image)
+    if data is None:
+        raise ValueError("No QR code found")
+    with span('classify'):
+        data = module.process_data(data, True)
+    with span('write'):
+        module.write_to_file(output, data, True)
+
+
+def run_vardaan(module, image, output, span):
+    with span('decode'):
+        module.decode_qr_code(image, output, True)
+
+
+DECODERS = {
+    'Rndastech': ('Rndastech/decoder/decoder.py', run_qr_decoder),
+    'Rndastech-ladder': ('Rndastech/decoder/decoder.py', run_ladder_decoder),
+    'Puravi': ('Puravi/decoder/decoder.py', run_qr_decoder),
+    'Ashutosh': ('Ashutosh/Decoder/decoder.py', run_ashutosh),
+    'KrishnaMohan': ('KrishnaMohan/Decoder/qr_decoder.py', run_krishnamohan),
+    'Darkknight0125': ('Darkknight0125/decoder.py', run_process_data),
+    'iking07': ('iking07/QR_decoder.py', run_process_data),
+    'shrut2606': ('shrut2606/qr.py', run_process_data),
+    'Vardaan-02': ('Vardaan-02/decoder/systum.py', run_vardaan),
+}
+
+# Encoders: (path, function taking input file and output image, payload is base64 encoded)
+ENCODERS = {
+    'Rndastech': ('Rndastech/encode.py', 'encode_to_qr', False),
+    'Puravi': ('Puravi/qr.py', 'generate_qr', False),
+    'Ashutosh': ('Ashutosh/qr.py', 'encode_file_to_qr', False),
+    'apexcoder007': ('apexcoder007/qr_encoder.py', 'encode_file_to_qr', False),
+    'Navigam1108': ('Navigam1108/qr_encoder.py', 'generate_qr', True),
+    'Sarvesh0955': ('Sarvesh0955/code.py', 'generate_qr_code', True),
+    'Rachit': ('Rachit/qr.py', 'generate_qr_code', False),
+}
+
+
+def load_module(name, path):
+    """Imports an implementation from its file under a unique module name."""
+    spec = importlib.util.spec_from_file_location(f"bench_{name.replace('-', '_')}_{len(sys.modules)}",
+                                                  os.path.join(TREE, path))
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+def build_corpus(directory, versions, levels, scales, noise_levels):
+    """Writes the synthetic QR images and returns their descriptions."""
+    corpus = []
+    for version in versions:
+        for level in levels:
+            capacity = CAPACITY[qrcode.util.MODE_8BIT_BYTE, LEVELS[level]][version - 1]
+            payload = text_payload(capacity, f"{version}{level}")
+            qr = qrcode.QRCode(version=version, error_correction=LEVELS[level], box_size=1, border=4)
+            qr.add_data(payload, optimize=0)
+            qr.make(fit=False)
+            for scale in scales:
+                qr.box_size = scale
+                clean = Image.open(io.BytesIO(render_png(qr))).convert('L')
+                for noise in noise_levels:
+                    name = f"v{version:02d}-{level}-s{scale}-n{noise:g}.png"
+                    path = os.path.join(directory, name)
+                    if noise:
+                        # Blend in Gaussian noise: lowers contrast and adds grain
+                        image = Image.blend(clean, Image.effect_noise(clean.size, 64).convert('L'), noise)
+                    else:
+                        image = clean
+                    image.save(path)
+                    corpus.append({'image': name, 'path': path, 'version': version, 'level': level,
+                                   'scale': scale, 'noise': noise, 'width': clean.width,
+                                   'payload': payload})
+    return corpus
+
+
+def time_runs(run, repeat):
+    """Calls run(spans) repeat times and returns the stage durations of the fastest run."""
+    best = None
+    for _ in range(repeat):
+        spans = Spans()
+        start = time.perf_counter()
+        run(spans)
+        total = time.perf_counter() - start
+        if best is None or total < best[0]:
+            best = total, spans.durations
+    return best
+
+
+def bench_reference(corpus, repeat):
+    """Times the Pillow + pyzbar core every decoder shares: open, preprocess, scan."""
+    results = []
+    for item in corpus:
+        def run(span):
+            with span('open'):
+                image = Image.open(item['path'])
+                image.load()
+            with span('preprocess'):
+                gray = image.convert('L')
+            with span('scan'):
+                symbols = pyzbar_decode(gray)
+            run.ok = bool(symbols) and symbols[0].data == item['payload']
+        total, stages = time_runs(run, repeat)
+        results.append({'implementation': 'reference', 'image': item['image'], 'ok': run.ok,
+                        'error': None, 'total': total, 'stages': stages})
+    return results
+
+
+def bench_decoders(names, corpus, repeat, workdir):
+    """Times every decoder on every corpus image and checks the written payload."""
+    results = []
+    for name in names:
+        path, adapter = DECODERS[name]
+        try:
+            module = load_module(name, path)
+        except Exception as e:
+            results.append({'implementation': name, 'image': None, 'ok': False,
+                            'error': f"import failed: {e}", 'total': None, 'stages': {}})
+            continue
+        for item in corpus:
+            output = os.path.join(workdir, f"{name}-{item['image']}.out")
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    total, stages = time_runs(lambda span: adapter(module, item['path'], output, span), repeat)
+                with open(output, 'rb') as file:
+                    ok, error = file.read() == item['payload'], None
+            except Exception as e:
+                ok, error, total, stages = False, str(e), None, {}
+            results.append({'implementation': name, 'image': item['image'], 'ok': ok,
+                            'error': error, 'total': total, 'stages': stages})
+    return results
+
+
+def bench_encoders(names, repeat, workdir):
+    """Times every encoder on text payloads and checks the image decodes back."""
+    results = []
+    for name in names:
+        path, function, is_base64 = ENCODERS[name]
+        try:
+            encode = getattr(load_module(name, path), function)
+        except Exception as e:
+            results.append({'implementation': name, 'payload_bytes': None, 'ok': False,
+                            'error': f"import failed: {e}", 'total': None, 'stages': {}})
+            continue
+        for size in ENCODER_PAYLOAD_SIZES:
+            payload = text_payload(size, size)
+            source = os.path.join(workdir, f"payload-{size}.txt")
+            with open(source, 'wb') as file:
+                file.write(payload)
+            output = os.path.join(workdir, f"{name}-{size}.png")
+            error = None
+
+            def run(span):
+                if os.path.exists(output):
+                    os.unlink(output)
+                with span('encode'):
+                    encode(source, output)
+
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    total, stages = time_runs(run, repeat)
+                symbols = pyzbar_decode(Image.open(output)) if os.path.exists(output) else []
+                data = symbols[0].data if symbols else b''
+                if is_base64:
+                    data = base64.b64decode(data) if data else b''
+                ok = data.endswith(payload)
+                if not os.path.exists(output):
+                    error = "no image written"
+            except (Exception, SystemExit) as e:
+                ok, error, total, stages = False, str(e) or type(e).__name__, None, {}
+            results.append({'implementation': name, 'payload_bytes': size, 'ok': ok,
+                            'error': error, 'total': total, 'stages': stages})
+    return results
+
+
+def summarize(results, unit_key):
+    """Returns per-implementation counts, median stage and total times, and throughput."""
+    summary = {}
+    for name in dict.fromkeys(result['implementation'] for result in results):
+        runs = [result for result in results if result['implementation'] == name]
+        timed = [result for result in runs if result['total'] is not None]
+        stage_names = dict.fromkeys(stage for result in timed for stage in result['stages'])
+        elapsed = sum(result['total'] for result in timed)
+        summary[name] = {
+            unit_key: len(runs),
+            'ok': sum(result['ok'] for result in runs),
+            'median_total': statistics.median(result['total'] for result in timed) if timed else None,
+            'median_stages': {stage: statistics.median(result['stages'][stage] for result in timed
+                                                       if stage in result['stages'])
+                              for stage in stage_names},
+            'throughput': len(timed) / elapsed if elapsed else None,
+        }
+    return summary
+
+
+def environment():
+    """Returns the commit and library versions the results were measured with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=TREE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in ('Pillow', 'qrcode', 'pyzbar'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'packages': versions}
+
+
+def print_summary(title, summary, unit_key):
+    print(f"\n{title}")
+    print(f"{'implementation':>15} {unit_key:>7} {'ok':>4} {'median ms':>10} {'per s':>7}  stages (median ms)")
+    for name, entry in summary.items():
+        median = f"{entry['median_total'] * 1e3:.1f}" if entry['median_total'] is not None else '-'
+        throughput = f"{entry['throughput']:.1f}" if entry['throughput'] else '-'
+        stages = ' '.join(f"{stage}={value * 1e3:.2f}" for stage, value in entry['median_stages'].items())
+        print(f"{name:>15} {entry[unit_key]:>7} {entry['ok']:>4} {median:>10} {throughput:>7}  {stages}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="QR encoder/decoder benchmark suite")
+    parser.add_argument('-o', '--output', default='bench-results.json', help="JSON results file")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument('--versions', type=int, nargs='+', default=[2, 10, 25, 40], help="QR versions")
+    parser.add_argument('--levels', nargs='+', choices=LEVELS, default=['L', 'H'], help="Error-correction levels")
+    parser.add_argument('--scales', type=int, nargs='+', default=[2, 6], help="Pixels per module")
+    parser.add_argument('--noise', type=float, nargs='+', default=[0.0, 0.2], help="Noise blend levels (0-1)")
+    parser.add_argument('--only', nargs='+', default=None, help="Implementations to run (default: all)")
+    parser.add_argument('--corpus', default=None, help="Keep the generated images in this directory")
+    args = parser.parse_args()
+
+    decoders = [name for name in DECODERS if not args.only or name in args.only]
+    encoders = [name for name in ENCODERS if not args.only or name in args.only]
+
+    # Implementations log and print progress; keep the report readable
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus_dir = args.corpus or os.path.join(workdir, 'corpus')
+        os.makedirs(corpus_dir, exist_ok=True)
+        corpus = build_corpus(corpus_dir, args.versions, args.levels, args.scales, args.noise)
+        print(f"Corpus: {len(corpus)} images in {corpus_dir}")
+
+        decode_results = bench_reference(corpus, args.repeat) + bench_decoders(decoders, corpus, args.repeat,
+                                                                               workdir)
+        encode_results = bench_encoders(encoders, args.repeat, workdir)
+    logging.disable(logging.NOTSET)
+
+    report = {
+        'schema': RESULTS_SCHEMA,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'config': {'repeat': args.repeat, 'versions': args.versions, 'levels': args.levels,
+                   'scales': args.scales, 'noise': args.noise, 'encoder_payload_sizes': ENCODER_PAYLOAD_SIZES},
+        'corpus': [{key: value for key, value in item.items() if key not in ('path', 'payload')}
+                   | {'payload_bytes': len(item['payload'])} for item in corpus],
+        'decoders': decode_results,
+        'encoders': encode_results,
+        'summary': {'decoders': summarize(decode_results, 'images'),
+                    'encoders': summarize(encode_results, 'payloads')},
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=1)
+
+    print_summary("Decoders (reference = the Pillow + pyzbar core they share)",
+                  report['summary']['decoders'], 'images')
+    print_summary("Encoders", report['summary']['encoders'], 'payloads')
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
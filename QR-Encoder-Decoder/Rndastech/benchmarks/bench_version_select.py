@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark QR code construction: qrcode's make(fit=True) against the capacity
+table version pick with the fast mask penalty, and with a fixed mask.
+
+Usage: python3 bench_version_select.py [-r REPEAT] [-m MASK]
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+from bisect import bisect_left
+
+import qrcode
+from qrcode import util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from encode import CAPACITY, ERROR_CORRECTION, FastQRCode  # noqa: E402
+
+SIZES = [10, 100, 500, 1000, 2000, 2900]
+
+
+def fit_version(length):
+    """Returns the smallest version holding length bytes, from the capacity table."""
+    return bisect_left(CAPACITY[util.MODE_8BIT_BYTE, ERROR_CORRECTION], length) + 1
+
+
+def make_fit(data):
+    """The baseline: qrcode's version fit and mask search."""
+    qr = qrcode.QRCode(version=None, error_correction=ERROR_CORRECTION)
+    qr.add_data(data, optimize=0)
+    qr.make(fit=True)
+    return qr
+
+
+def make_fast(data, mask=None):
+    """Version from the capacity table, mask scored with mask_penalty (or fixed)."""
+    qr = FastQRCode(version=fit_version(len(data)), error_correction=ERROR_CORRECTION, mask_pattern=mask)
+    qr.add_data(data, optimize=0)
+    qr.make(fit=False)
+    return qr
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="QR version and mask selection benchmark")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument('-m', '--mask', type=int, default=0, help="Mask used for the fixed-mask column")
+    args = parser.parse_args()
+
+    print(f"{'bytes':>6} {'version':>7} {'fit ms':>8} {'fast ms':>8} {'speedup':>8} {'fixed ms':>9} {'speedup':>8}")
+    for size in SIZES:
+        data = random.Random(size).randbytes(size)
+        baseline = make_fit(data)
+        # The fast path must produce the identical symbol
+        assert make_fast(data).modules == baseline.modules
+
+        fit = min(timeit.repeat(lambda: make_fit(data), number=1, repeat=args.repeat))
+        fast = min(timeit.repeat(lambda: make_fast(data), number=1, repeat=args.repeat))
+        fixed = min(timeit.repeat(lambda: make_fast(data, args.mask), number=1, repeat=args.repeat))
+        print(f"{size:>6} {baseline.version:>7} {fit * 1e3:>8.1f} {fast * 1e3:>8.1f} {fit / fast:>7.1f}x "
+              f"{fixed * 1e3:>9.1f} {fit / fixed:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,43 +5,275 @@ QR Code Decoder
 Author: Ritesh Narayan Das
 """
 
+from __future__ import annotations
+
+import io
 import os
+import re
 import sys
-import base64
+import json
+import codecs
+import time
+import struct
 import logging
 import argparse
-from typing import Optional, Union, Tuple
+import threading
+import contextlib
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Union, Tuple
 from pathlib import Path
-from dataclasses import dataclass
 from enum import Enum, auto
 
-import PIL
-from PIL import Image
-from pyzbar.pyzbar import decode as pyzbar_decode
-from pyzbar.pyzbar import Decoded
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Pillow, pyzbar (which loads libzbar), sqlite3, multiprocessing, http.server and the
+# compression modules are imported where they are used, so --help, argument errors
+# and the modes that do not need them start without paying for them. Records are
+# NamedTuples rather than dataclasses, which would import inspect on every start.
+if TYPE_CHECKING:
+    import asyncio
+    import sqlite3
+    import cProfile
+    from concurrent.futures import Executor
+    from PIL import Image
+    from pyzbar.pyzbar import Decoded, Point, Rect
+
 logger = logging.getLogger(__name__)
 
 
+def configure_logging() -> None:
+    """Configure logging for command-line runs; importing the module leaves logging alone."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+# ASCII whitespace stripped from binary string payloads
+WHITESPACE_BYTES = b' \t\n\r\x0b\x0c'
+
+# Characters that make up a binary string payload
+BIT_STRING_CHARS = b'01 \n'
+
+# Standard base64 alphabet and the 6-bit value of each character
+BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+BASE64_VALUES = {char: value for value, char in enumerate(BASE64_ALPHABET)}
+
+# File suffixes treated as images when scanning a directory in batch mode
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp'}
+
+# Longest side of the image the downscale preprocessing stage works on
+DEFAULT_MAX_DIMENSION = 1024
+
+# Region-of-interest detection: edge-density grid cell size (pixels of the
+# reduced page), mean edge strength that marks a cell as busy, and crop margin
+ROI_CELL_SIZE = 4
+ROI_EDGE_THRESHOLD = 40
+ROI_PADDING = 0.2
+
+# Regions covering more of the page than this are left to the full-page stages
+ROI_MAX_AREA_FRACTION = 0.25
+
+# Robustness ladder: unsharp mask applied by the sharpen stage (radius, percent,
+# threshold), and the longest side and largest factor the upscale stage enlarges to
+SHARPEN_MASK = (2, 150, 3)
+UPSCALE_TARGET = 1600
+UPSCALE_MAX_FACTOR = 4
+
+# Decode cache defaults; bump CACHE_FORMAT when the stored layout changes
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'qr-decoder'
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+CACHE_FORMAT = 1
+
+# Decode server limits
+DEFAULT_SERVE_PORT = 8765
+MAX_REQUEST_BYTES = 32 * 1024 * 1024
+REQUEST_TIMEOUT = 60
+
+# Chunk header written by `encode.py chunked`: magic, format version, index, total, file hash
+CHUNK_MAGIC = b'QRCH'
+CHUNK_VERSION = 1
+CHUNK_HEADER = struct.Struct('>4sBHH16s')
+
+# File header written by `encode.py` ahead of the payload: magic, header version,
+# compression codec (0 is none), original file size, truncated SHA-256 of the file,
+# chunk count, extension length; the extension follows
+FILE_MAGIC = b'QRF'
+FILE_HEADER_VERSION = 1
+FILE_HEADER = struct.Struct('>3sBBI8sHB')
+COMPRESSION_CODECS = {1: 'zlib', 2: 'lzma', 3: 'zstd'}
+
+# Older encoders prefixed the payload with an EXT:<extension> line instead
+LEGACY_METADATA_PREFIX = b'EXT:'
+
+# Extensions from a header are only appended to output paths if they look like one
+SAFE_EXTENSION = re.compile(r'\.[A-Za-z0-9_-]{1,32}')
+
+# Size of the blocks payloads are decompressed and written in
+WRITE_BLOCK_SIZE = 64 * 1024
+
+# Timing spans recorded per decoded image, in pipeline order
+TIMING_STAGES = ('cache', 'load', 'preprocess', 'scan', 'classify', 'write')
+
+# Functions listed by --profile when the stats are printed rather than saved
+PROFILE_TOP = 30
+
+
 class DataFormat(Enum):
     """Enumeration for supported data formats."""
     BINARY = auto()
     TEXT = auto()
 
 
-@dataclass
-class QRContent:
+class PreprocessStage(Enum):
+    """Image preparation steps tried, in order, until a QR code is found."""
+    ROI = 'roi'                # crops of high-contrast, roughly square regions
+    DOWNSCALE = 'downscale'    # grayscale copy reduced to max_dimension (JPEG draft decoding)
+    GRAYSCALE = 'grayscale'    # full-resolution grayscale
+    BINARIZE = 'binarize'      # full-resolution adaptive threshold
+    ORIGINAL = 'original'      # the image exactly as loaded
+    # Robustness ladder: consecutive ladder stages are scanned concurrently
+    OTSU = 'otsu'              # global threshold chosen by Otsu's method
+    SHARPEN = 'sharpen'        # unsharp mask, for blurred scans
+    ROTATE = 'rotate'          # 90, 180 and 270 degree rotations
+    UPSCALE = 'upscale'        # enlarged copy, for codes only a few pixels per module
+
+
+LADDER_STAGES = frozenset((PreprocessStage.OTSU, PreprocessStage.SHARPEN,
+                           PreprocessStage.ROTATE, PreprocessStage.UPSCALE))
+# Stages --stages ladder stands for: the defaults, then the full escalation
+STAGE_PRESETS = {'ladder': 'downscale,grayscale,otsu,sharpen,rotate,upscale'}
+
+
+class PreprocessOptions(NamedTuple):
+    """Configuration for the progressive preprocessing pipeline."""
+    stages: Tuple[PreprocessStage, ...] = (PreprocessStage.DOWNSCALE, PreprocessStage.GRAYSCALE)
+    max_dimension: int = DEFAULT_MAX_DIMENSION
+    binarize_radius: Optional[int] = None  # None: scale with the image size
+    binarize_offset: int = 10
+    roi_work_size: int = 512
+    roi_max_regions: int = 16
+    roi_workers: int = 4
+    ladder_workers: int = 4
+    time_budget: Optional[float] = None  # seconds per image; None: try every stage
+
+
+class PayloadKind(Enum):
+    """Classification of the raw bytes stored in a QR code."""
+    RAW = auto()
+    BASE64 = auto()
+    BIT_STRING = auto()
+    BASE64_BIT_STRING = auto()
+
+
+class FileHeader(NamedTuple):
+    """File metadata stored ahead of the payload; size and digest are None for legacy EXT: lines."""
+    version: int
+    extension: str
+    compression: Optional[str] = None
+    size: Optional[int] = None
+    digest: Optional[bytes] = None
+    chunks: int = 1
+
+
+class QRContent(NamedTuple):
     """Data class to store decoded QR content and metadata."""
     raw_data: bytes
     is_base64: bool
-    decoded_data: bytes
+    decoded_data: Union[bytes, memoryview]
     data_format: DataFormat
+    payload_kind: PayloadKind = PayloadKind.RAW
+    stage: Optional[PreprocessStage] = None
+    rect: Optional[Rect] = None
+    polygon: Optional[List[Point]] = None
+    cached: bool = False
+    header: Optional[FileHeader] = None
+
+    @property
+    def compression(self) -> Optional[str]:
+        """Codec the payload was compressed with, if any."""
+        return self.header.compression if self.header else None
+
+    def iter_data(self, block_size: int = WRITE_BLOCK_SIZE) -> Iterator[bytes]:
+        """Yield the payload in blocks, decompressing it on the fly and checking it against the header."""
+        import hashlib
+
+        if self.compression is None:
+            blocks = iter([self.decoded_data])
+        else:
+            blocks = decompress_blocks(self.compression, self.decoded_data, block_size)
+        if self.header is None or self.header.size is None:
+            yield from blocks
+            return
+
+        hasher = hashlib.sha256()
+        size = 0
+        for block in blocks:
+            hasher.update(block)
+            size += len(block)
+            yield block
+        if size != self.header.size:
+            raise PayloadIntegrityError(f"Payload is {size} bytes but its header records {self.header.size}")
+        if hasher.digest()[:len(self.header.digest)] != self.header.digest:
+            raise PayloadIntegrityError("Payload does not match the hash in its header")
+
+    @property
+    def data(self) -> bytes:
+        """The whole (decompressed) payload."""
+        return b''.join(self.iter_data())
+
+
+class CachedPoint(NamedTuple):
+    """A polygon vertex read back from the decode cache, shaped like pyzbar's Point."""
+    x: int
+    y: int
+
+
+class CachedRect(NamedTuple):
+    """A bounding box read back from the decode cache, shaped like pyzbar's Rect."""
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+class CachedSymbol(NamedTuple):
+    """A symbol read back from the decode cache, shaped like pyzbar's Decoded so hits never load libzbar."""
+    data: bytes
+    type: str
+    rect: CachedRect
+    polygon: List[CachedPoint]
+    quality: Optional[int] = None
+    orientation: Optional[str] = None
+
+
+class ScanResult(NamedTuple):
+    """Symbols found in an image and how they were found."""
+    symbols: List[Union[Decoded, CachedSymbol]]
+    stage: PreprocessStage
+    cached: bool = False
+
+
+class StageTimings:
+    """Wall-clock seconds spent in each pipeline stage while decoding one image."""
+    __slots__ = ('image', 'spans', 'stage', 'success')
+
+    def __init__(self, image: str):
+        self.image = image
+        self.spans: Dict[str, float] = {}
+        self.stage: Optional[PreprocessStage] = None
+        self.success = True
+
+    @property
+    def total(self) -> float:
+        return sum(self.spans.values())
+
+    def as_dict(self) -> dict:
+        """JSON-ready record; spans are in milliseconds."""
+        return {
+            'image': self.image,
+            'success': self.success,
+            'stage': self.stage.value if self.stage else None,
+            'spans_ms': {name: round(seconds * 1e3, 3) for name, seconds in self.spans.items()},
+            'total_ms': round(self.total * 1e3, 3),
+        }
 
 
 class QRDecoderError(Exception):
@@ -59,150 +291,1748 @@ class ImageLoadError(QRDecoderError):
     pass
 
 
+class DecompressionError(QRDecoderError):
+    """Exception raised when a compressed payload is corrupt, truncated or needs a missing codec."""
+    pass
+
+
+class PayloadIntegrityError(QRDecoderError):
+    """Exception raised when a payload does not match the size or hash in its header."""
+    pass
+
+
+class ChunkReassemblyError(QRDecoderError):
+    """Exception raised when a chunked QR sequence cannot be restored."""
+    pass
+
+
+class Chunk(NamedTuple):
+    """A single symbol of a chunked QR sequence."""
+    index: int
+    total: int
+    digest: bytes
+    payload: bytes
+    source: Path
+
+
+class DecodeCache:
+    """On-disk cache of scan results keyed by image content and decoder options.
+
+    Entries live in a SQLite database and are evicted least-recently-used
+    once their total size exceeds max_bytes. Safe to share between processes.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.path = Path(cache_dir) / 'decode-cache.sqlite3'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __getstate__(self) -> dict:
+        # Connections cannot cross process boundaries; workers open their own
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._connection is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        return self._connection
+
+    @staticmethod
+    def key(image_bytes: bytes, options: PreprocessOptions) -> str:
+        """Content hash of the image combined with everything that affects the scan."""
+        import hashlib
+
+        digest = hashlib.blake2b(image_bytes, digest_size=20)
+        digest.update(f"{CACHE_FORMAT}:{options!r}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[ScanResult]:
+        """Return the cached scan result for key, or None."""
+        import base64
+
+        row = self.connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        self.hits += 1
+
+        record = json.loads(row[0])
+        symbols = [CachedSymbol(base64.b64decode(fields['data']), fields.get('type', 'QRCODE'),
+                                CachedRect(*fields['rect']), [CachedPoint(*p) for p in fields['polygon']],
+                                fields.get('quality'), fields.get('orientation'))
+                   for fields in record['symbols']]
+        return ScanResult(symbols, PreprocessStage(record['stage']), cached=True)
+
+    def put(self, key: str, result: ScanResult) -> None:
+        """Store a scan result and evict old entries beyond the size limit."""
+        import base64
+
+        record = {
+            'stage': result.stage.value,
+            'symbols': [dict(obj._asdict(), data=base64.b64encode(obj.data).decode('ascii'))
+                        for obj in result.symbols],
+        }
+        value = json.dumps(record).encode('utf-8')
+        self.connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                (key, value, len(value), time.time()))
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.connection.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.connection.executemany('DELETE FROM entries WHERE key = ?', stale)
+
+
+class StageTimer:
+    """Collects per-stage timing spans for each image a decoder processes.
+
+    Each thread times its own current image, so one timer can serve a decoder
+    shared between threads. Finished records are collected with drain().
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._records: List[StageTimings] = []
+        self._lock = threading.Lock()
+
+    def start(self, image: str) -> StageTimings:
+        """Begin timing a new image in this thread."""
+        record = StageTimings(image)
+        self._local.current = record
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Add the time spent in the block to the current image's stage."""
+        record = getattr(self._local, 'current', None)
+        if record is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record.spans[stage] = record.spans.get(stage, 0.0) + time.perf_counter() - start
+
+    def drain(self) -> List[StageTimings]:
+        """Return and forget the records collected so far."""
+        with self._lock:
+            records, self._records = self._records, []
+        return records
+
+
+class TimingReport:
+    """Writes stage timings as JSON lines as they arrive, or as a summary table on close."""
+
+    def __init__(self, style: str, stream: TextIO):
+        self.style = style
+        self.stream = stream
+        self.records: List[StageTimings] = []
+        self._lock = threading.Lock()
+
+    def add(self, records: Iterable[StageTimings]) -> None:
+        with self._lock:
+            for record in records:
+                if self.style == 'json':
+                    self.stream.write(json.dumps(record.as_dict()) + '\n')
+                    self.stream.flush()
+                else:
+                    self.records.append(record)
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> float:
+        """Nearest-rank percentile of sorted values."""
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def table(self) -> str:
+        """Per-stage count, total, mean, median, p95 and max in milliseconds."""
+        failed = sum(1 for r in self.records if not r.success)
+        lines = [f"Stage timings for {len(self.records)} images ({failed} failed), milliseconds",
+                 f"{'stage':<11}{'count':>7}{'total':>11}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}"]
+        columns = [(stage, [r.spans[stage] for r in self.records if stage in r.spans]) for stage in TIMING_STAGES]
+        columns.append(('total', [r.total for r in self.records]))
+        for stage, values in columns:
+            if not values:
+                continue
+            values.sort()
+            lines.append(f"{stage:<11}{len(values):>7}{sum(values) * 1e3:>11.2f}"
+                         f"{sum(values) / len(values) * 1e3:>9.2f}{self._percentile(values, 0.5) * 1e3:>9.2f}"
+                         f"{self._percentile(values, 0.95) * 1e3:>9.2f}{values[-1] * 1e3:>9.2f}")
+        return '\n'.join(lines)
+
+    def close(self) -> None:
+        """Write the summary table in table style and release the stream."""
+        if self.style == 'table' and self.records:
+            self.stream.write(self.table() + '\n')
+        self.stream.flush()
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+
+def decompress_blocks(codec: str, data: bytes, block_size: int = WRITE_BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield a compressed payload's contents in blocks of at most block_size bytes."""
+    try:
+        if codec == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise DecompressionError("zstd payloads need the zstandard package")
+            with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+                yield from iter(lambda: reader.read(block_size), b'')
+        elif codec == 'zlib':
+            import zlib
+
+            decompressor = zlib.decompressobj()
+            while data:
+                block = decompressor.decompress(data, block_size)
+                data = decompressor.unconsumed_tail
+                if block:
+                    yield block
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+            if not decompressor.eof:
+                raise DecompressionError("Truncated zlib payload")
+        else:
+            import lzma
+
+            decompressor = lzma.LZMADecompressor()
+            block = decompressor.decompress(data, block_size)
+            while True:
+                if block:
+                    yield block
+                if decompressor.eof:
+                    break
+                if decompressor.needs_input:
+                    raise DecompressionError("Truncated lzma payload")
+                block = decompressor.decompress(b'', block_size)
+    except DecompressionError:
+        raise
+    except Exception as e:
+        raise DecompressionError(f"Corrupt {codec} payload: {e}")
+
+
 class QRDecoder:
     """Sophisticated QR code decoder with support for multiple formats and encodings."""
 
+    def __init__(self, options: Optional[PreprocessOptions] = None,
+                 cache: Optional[DecodeCache] = None, timer: Optional[StageTimer] = None):
+        self.options = options or PreprocessOptions()
+        self.cache = cache
+        self.timer = timer
+        self._ladder_pool: Optional[Executor] = None
+        self._ladder_lock = threading.Lock()
+
+    def span(self, stage: str) -> contextlib.AbstractContextManager:
+        """Time a block as one of the current image's stages when a timer is attached."""
+        return self.timer.span(stage) if self.timer else contextlib.nullcontext()
+
     @staticmethod
     def _is_base64(data: bytes) -> bool:
-        """Check if data is base64 encoded."""
-        try:
-            # Try to decode then re-encode to verify
-            decoded = base64.b64decode(data, validate=True)
-            reencoded = base64.b64encode(decoded)
-            return data == reencoded
-        except Exception:
+        """Check if data is canonical base64, without decoding it."""
+        if len(data) % 4:
+            return False
+        body = data.rstrip(b'=')
+        padding = len(data) - len(body)
+        if padding > 2 or body.translate(None, BASE64_ALPHABET):
             return False
+        # Unused bits of the last character must be zero for the data to re-encode identically
+        if padding:
+            return not BASE64_VALUES[body[-1]] & (0x0F if padding == 2 else 0x03)
+        return True
 
     @staticmethod
-    def _binary_string_to_bytes(binary_string: str) -> bytes:
+    def _binary_string_to_bytes(binary_string: Union[str, bytes]) -> bytes:
         """Convert a string of binary digits to actual binary data."""
-        # Remove spaces and newlines
-        binary_string = ''.join(binary_string.split())
+        # Remove whitespace; non-ASCII input fails here with a ValueError
+        if isinstance(binary_string, str):
+            binary_string = binary_string.encode('ascii')
+        bits = binary_string.translate(None, WHITESPACE_BYTES)
 
-        if not all(c in '01' for c in binary_string):
+        if bits.translate(None, b'01'):
             raise ValueError("Invalid binary string - contains non-binary characters")
 
-        # Process 8 bits at a time
-        byte_array = bytearray()
-        for i in range(0, len(binary_string), 8):
-            byte = binary_string[i:i + 8]
-            byte_array.append(int(byte, 2))
-        return bytes(byte_array)
+        # Parse whole bytes in a single int() call; a trailing partial group
+        # becomes its own byte, as with the per-8-bit loop
+        whole = len(bits) - len(bits) % 8
+        data = int(bits[:whole], 2).to_bytes(whole // 8, 'big') if whole else b''
+        if whole < len(bits):
+            data += bytes([int(bits[whole:], 2)])
+        return data
+
+    @classmethod
+    def _classify_payload(cls, data: bytes) -> Tuple[PayloadKind, bytes]:
+        """Classify QR payload bytes in one pass and decode them exactly once."""
+        if not data.translate(None, BIT_STRING_CHARS):
+            return PayloadKind.BIT_STRING, cls._binary_string_to_bytes(data)
+        if not cls._is_base64(data):
+            return PayloadKind.RAW, data
+        import base64
+
+        decoded = base64.b64decode(data)
+        if not decoded.translate(None, BIT_STRING_CHARS):
+            return PayloadKind.BASE64_BIT_STRING, cls._binary_string_to_bytes(decoded)
+        return PayloadKind.BASE64, decoded
+
+    @staticmethod
+    def _parse_header(data: bytes) -> Tuple[Optional[FileHeader], Union[bytes, memoryview]]:
+        """Split a payload into its file header and a zero-copy view of the data after it.
+
+        Payloads without a recognized header are returned unchanged.
+        """
+        if data[:len(FILE_MAGIC)] == FILE_MAGIC and len(data) >= FILE_HEADER.size:
+            _, version, codec, size, digest, chunks, extension_length = FILE_HEADER.unpack_from(data)
+            end = FILE_HEADER.size + extension_length
+            if version != FILE_HEADER_VERSION:
+                logger.warning(f"Unsupported file header version {version}; keeping the payload as is")
+            elif (codec == 0 or codec in COMPRESSION_CODECS) and len(data) >= end:
+                view = memoryview(data)
+                extension = str(view[FILE_HEADER.size:end], 'utf-8', 'replace')
+                header = FileHeader(version, extension, COMPRESSION_CODECS.get(codec), size, digest, chunks)
+                return header, view[end:]
+        elif data[:len(LEGACY_METADATA_PREFIX)] == LEGACY_METADATA_PREFIX:
+            newline = data.find(b'\n', 0, 256)
+            if newline != -1:
+                extension = data[len(LEGACY_METADATA_PREFIX):newline].decode('utf-8', 'replace')
+                return FileHeader(0, extension), memoryview(data)[newline + 1:]
+        return None, data
+
+    @staticmethod
+    def _open(source: Union[str, Path, bytes]) -> Image.Image:
+        """Open an image from a path or in-memory bytes without decoding its pixels yet."""
+        from PIL import Image, UnidentifiedImageError
 
-    def decode(self, image_path: Union[str, Path], data_format: DataFormat) -> QRContent:
-        """Decode QR code from image file."""
-        logger.info(f"Processing image: {image_path}")
+        try:
+            if isinstance(source, bytes):
+                return Image.open(io.BytesIO(source))
+            return Image.open(source)
+        except UnidentifiedImageError:
+            raise ImageLoadError(f"Cannot load image {QRDecoder._label(source)}: not a recognized image file")
+        except Exception as e:
+            raise ImageLoadError(f"Cannot load image {QRDecoder._label(source)}: {e}")
 
+    @staticmethod
+    def _load_pixels(image: Image.Image, source: Union[str, Path, bytes]) -> Image.Image:
+        """Decode an opened image's pixels, so file I/O is timed apart from preprocessing."""
         try:
-            # Load and decode QR code
-            image = Image.open(image_path)
-            decoded_objects = pyzbar_decode(image)
-            if not decoded_objects:
-                raise QRCodeNotFoundError("No QR code found in image")
+            image.load()
+        except Exception as e:
+            raise ImageLoadError(f"Cannot load image {QRDecoder._label(source)}: {e}")
+        return image
+
+    def _load(self, source: Union[str, Path, bytes]) -> Image.Image:
+        """Open an image and decode its pixels."""
+        with self.span('load'):
+            return self._load_pixels(self._open(source), source)
+
+    def _downscale(self, source: Union[str, Path, bytes]) -> Optional[Tuple[Image.Image, float]]:
+        """Return a reduced grayscale copy and its scale, or None if the image is already small."""
+        limit = self.options.max_dimension
+        with self.span('load'):
+            image = self._open(source)
+            original_width = image.size[0]
+            if max(image.size) <= limit:
+                return None
+            if image.format == 'JPEG':
+                # Let libjpeg decode straight to grayscale at 1/2, 1/4 or 1/8 scale
+                image.draft('L', (limit, limit))
+            self._load_pixels(image, source)
+        with self.span('preprocess'):
+            image = image.convert('L')
+            factor = -(-max(image.size) // limit)
+            if factor > 1:
+                image = image.reduce(factor)
+        return image, original_width / image.size[0]
+
+    def _binarize(self, gray: Image.Image) -> Image.Image:
+        """Adaptive threshold: pixels darker than their local mean by offset become black."""
+        from PIL import ImageChops, ImageFilter
+
+        radius = self.options.binarize_radius or max(8, min(gray.size) // 16)
+        local_mean = gray.filter(ImageFilter.BoxBlur(radius))
+        darkness = ImageChops.subtract(local_mean, gray)
+        offset = self.options.binarize_offset
+        return darkness.point(lambda v: 0 if v > offset else 255)
+
+    def _find_regions(self, gray: Image.Image) -> List[Tuple[int, int, int, int]]:
+        """Locate high-contrast, roughly square blocks that may hold QR codes.
+
+        Edge density is measured on a reduced copy of the page; busy grid cells
+        are grouped into connected components whose padded bounding boxes are
+        returned in full-resolution coordinates, largest first. Text blocks that
+        merge into page-sized components are dropped, since scanning them saves
+        nothing over a full-page stage.
+        """
+        from PIL import ImageFilter
+
+        factor = max(1, max(gray.size) // self.options.roi_work_size)
+        work = gray.reduce(factor) if factor > 1 else gray
+        density = work.filter(ImageFilter.FIND_EDGES).filter(ImageFilter.BoxBlur(2))
+        cells = density.reduce(ROI_CELL_SIZE)
+        cols, rows = cells.size
+        busy = [v > ROI_EDGE_THRESHOLD for v in cells.tobytes()]
+
+        boxes = []
+        seen = [False] * len(busy)
+        for start in range(len(busy)):
+            if not busy[start] or seen[start]:
+                continue
+            # Flood-fill one component, tracking its bounding box in cells
+            seen[start] = True
+            stack = [start]
+            left, top, right, bottom = cols, rows, 0, 0
+            while stack:
+                cell = stack.pop()
+                y, x = divmod(cell, cols)
+                left, top = min(left, x), min(top, y)
+                right, bottom = max(right, x + 1), max(bottom, y + 1)
+                for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    if 0 <= nx < cols and 0 <= ny < rows:
+                        neighbour = ny * cols + nx
+                        if busy[neighbour] and not seen[neighbour]:
+                            seen[neighbour] = True
+                            stack.append(neighbour)
+
+            width, height = right - left, bottom - top
+            if min(width, height) < 2 or not 1 / 3 <= width / height <= 3:
+                continue
+            pad_x, pad_y = int(width * ROI_PADDING) + 1, int(height * ROI_PADDING) + 1
+            cell_px = ROI_CELL_SIZE * factor
+            boxes.append((max(0, (left - pad_x) * cell_px),
+                          max(0, (top - pad_y) * cell_px),
+                          min(gray.size[0], (right + pad_x) * cell_px),
+                          min(gray.size[1], (bottom + pad_y) * cell_px)))
+
+        max_area = ROI_MAX_AREA_FRACTION * gray.size[0] * gray.size[1]
+        boxes = [b for b in boxes if (b[2] - b[0]) * (b[3] - b[1]) <= max_area]
+        boxes.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+        return boxes[:self.options.roi_max_regions]
+
+    @staticmethod
+    def _offset(obj: Decoded, dx: int, dy: int, scale: float = 1.0) -> Decoded:
+        """Map a symbol found in a crop or reduced copy back to original image coordinates."""
+        from pyzbar.pyzbar import Point, Rect
+
+        rect = obj.rect
+        return obj._replace(
+            rect=Rect(round(rect.left * scale) + dx, round(rect.top * scale) + dy,
+                      round(rect.width * scale), round(rect.height * scale)),
+            polygon=[Point(round(p.x * scale) + dx, round(p.y * scale) + dy) for p in obj.polygon])
+
+    def _scan_regions(self, gray: Image.Image) -> List[Decoded]:
+        """Scan candidate regions in parallel; libzbar releases the GIL while scanning."""
+        from concurrent.futures import ThreadPoolExecutor
+        from pyzbar.pyzbar import decode as pyzbar_decode
+
+        with self.span('preprocess'):
+            boxes = self._find_regions(gray)
+            crops = [gray.crop(box) for box in boxes]
+        if not boxes:
+            return []
+        logger.debug(f"Scanning {len(boxes)} candidate regions")
+        with self.span('scan'), ThreadPoolExecutor(max_workers=min(len(crops), self.options.roi_workers)) as executor:
+            results = list(executor.map(pyzbar_decode, crops))
+
+        # Overlapping crops can report the same symbol twice
+        found: List[Decoded] = []
+        for box, decoded_objects in zip(boxes, results):
+            for obj in map(lambda o: self._offset(o, box[0], box[1]), decoded_objects):
+                if not any(obj.data == other.data
+                           and abs(obj.rect.left - other.rect.left) < obj.rect.width / 2
+                           and abs(obj.rect.top - other.rect.top) < obj.rect.height / 2
+                           for other in found):
+                    found.append(obj)
+        return found
 
-            qr_data = decoded_objects[0].data
+    @staticmethod
+    def _otsu_table(gray: Image.Image) -> List[int]:
+        """Return the point() table thresholding a grayscale image at its Otsu level."""
+        histogram = gray.histogram()
+        total = sum(histogram)
+        weighted_total = sum(value * count for value, count in enumerate(histogram))
+        best_level, best_variance = 0, -1.0
+        background = weighted_background = 0
+        for level, count in enumerate(histogram):
+            background += count
+            weighted_background += level * count
+            foreground = total - background
+            if not background or not foreground:
+                continue
+            # Maximize the between-class variance of the two sides of the threshold
+            mean_gap = weighted_background / background - (weighted_total - weighted_background) / foreground
+            variance = background * foreground * mean_gap * mean_gap
+            if variance > best_variance:
+                best_level, best_variance = level, variance
+        return [255 if value > best_level else 0 for value in range(256)]
+
+    @staticmethod
+    def _unrotate(obj: Decoded, transpose: int, size: Tuple[int, int]) -> Decoded:
+        """Map a symbol found in a rotated copy back to original image coordinates."""
+        from PIL import Image
+        from pyzbar.pyzbar import Point, Rect
+
+        width, height = size
+        if transpose == Image.Transpose.ROTATE_90:
+            points = [Point(width - 1 - p.y, p.x) for p in obj.polygon]
+        elif transpose == Image.Transpose.ROTATE_180:
+            points = [Point(width - 1 - p.x, height - 1 - p.y) for p in obj.polygon]
+        else:
+            points = [Point(p.y, height - 1 - p.x) for p in obj.polygon]
+        xs, ys = [p.x for p in points], [p.y for p in points]
+        return obj._replace(rect=Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)), polygon=points)
+
+    def _ladder_jobs(self, gray: Image.Image, stages: List[PreprocessStage]) -> List[Tuple[PreprocessStage, int]]:
+        """List the (stage, variant) candidates of a run of ladder stages; rotate has one per angle."""
+        from PIL import Image
+
+        jobs = []
+        for stage in stages:
+            if stage is PreprocessStage.ROTATE:
+                jobs.extend((stage, transpose) for transpose in (Image.Transpose.ROTATE_90,
+                                                                  Image.Transpose.ROTATE_180,
+                                                                  Image.Transpose.ROTATE_270))
+            elif stage is PreprocessStage.UPSCALE:
+                # Only small images are enlarged; large ones hold codes the other stages can read
+                factor = min(UPSCALE_MAX_FACTOR, UPSCALE_TARGET // max(gray.size))
+                if factor >= 2:
+                    jobs.append((stage, factor))
+            else:
+                jobs.append((stage, 0))
+        return jobs
+
+    def _ladder_scan(self, gray: Image.Image, stage: PreprocessStage, variant: int) -> List[Decoded]:
+        """Prepare one ladder candidate and scan it, returning symbols in original image coordinates."""
+        from PIL import Image, ImageFilter
+        from pyzbar.pyzbar import decode as pyzbar_decode
+
+        if stage is PreprocessStage.OTSU:
+            return pyzbar_decode(gray.point(self._otsu_table(gray)))
+        if stage is PreprocessStage.SHARPEN:
+            return pyzbar_decode(gray.filter(ImageFilter.UnsharpMask(*SHARPEN_MASK)))
+        if stage is PreprocessStage.ROTATE:
+            return [self._unrotate(obj, variant, gray.size) for obj in pyzbar_decode(gray.transpose(variant))]
+        enlarged = gray.resize((gray.size[0] * variant, gray.size[1] * variant), Image.Resampling.BICUBIC)
+        return [self._offset(obj, 0, 0, 1 / variant) for obj in pyzbar_decode(enlarged)]
+
+    def _ladder_executor(self) -> Executor:
+        """The decoder's ladder thread pool, created on first use and shared by every image it scans."""
+        with self._ladder_lock:
+            if self._ladder_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
 
-            # Default: use the raw data directly
-            decoded_data = qr_data
+                self._ladder_pool = ThreadPoolExecutor(max_workers=self.options.ladder_workers,
+                                                       thread_name_prefix='qr-ladder')
+            return self._ladder_pool
 
-            # Try to decode as ASCII to check for binary string
+    def _scan_ladder(self, gray: Image.Image, stages: List[PreprocessStage],
+                     deadline: Optional[float]) -> Optional[Tuple[List[Decoded], PreprocessStage]]:
+        """Scan the candidates of a run of ladder stages on a thread pool; the first to find a QR code wins.
+
+        Pillow and libzbar release the GIL, so candidates run concurrently.
+        Queued candidates are cancelled once one succeeds or the deadline passes;
+        ones already running finish in the background, holding their worker of
+        the decoder's pool, so later images queue behind them and at most
+        ladder_workers scans ever run at once.
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        jobs = self._ladder_jobs(gray, stages)
+        if not jobs:
+            return None
+        executor = self._ladder_executor()
+        pending = {executor.submit(self._ladder_scan, gray, stage, variant): stage for stage, variant in jobs}
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    raise QRCodeNotFoundError(
+                        f"No QR code found within the {self.options.time_budget:g} s time budget")
+                for future in done:
+                    stage = pending.pop(future)
+                    decoded_objects = future.result()
+                    if decoded_objects:
+                        logger.debug(f"QR code found at stage '{stage.value}'")
+                        return decoded_objects, stage
+            logger.debug(f"No QR code at stages {', '.join(stage.value for stage in stages)}")
+            return None
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _label(image: Union[str, Path, bytes]) -> str:
+        """Describe an image source for log and error messages."""
+        return f"<{len(image)} bytes>" if isinstance(image, bytes) else str(image)
+
+    def _scan(self, image_path: Union[str, Path, bytes]) -> ScanResult:
+        """Scan an image path or in-memory image bytes, answering from the decode cache when possible."""
+        if self.cache is None:
+            return ScanResult(*self._scan_image(image_path))
+
+        if isinstance(image_path, bytes):
+            image_bytes = image_path
+        else:
             try:
-                text_data = qr_data.decode('ascii')
-                # Check if it's a binary string representation
-                if all(c in '01 \n' for c in text_data):
-                    logger.info("Detected binary string representation")
-                    decoded_data = self._binary_string_to_bytes(text_data)
-                    logger.debug(f"Converted binary string to {len(decoded_data)} bytes")
-                    return QRContent(
-                        raw_data=qr_data,
-                        is_base64=False,
-                        decoded_data=decoded_data,
-                        data_format=data_format
-                    )
-            except UnicodeDecodeError:
-                pass
-
-            # Check for base64 encoding
-            if self._is_base64(qr_data):
-                logger.info("Detected base64 encoded data")
-                try:
-                    decoded_data = base64.b64decode(qr_data)
-                    # Check if base64-decoded data is a binary string
-                    binary_data_as_text = decoded_data.decode('ascii')
-                    if all(c in '01 \n' for c in binary_data_as_text):
-                        logger.info("Base64 decoded binary string representation detected")
-                        decoded_data = self._binary_string_to_bytes(binary_data_as_text)
-                except (UnicodeDecodeError, ValueError):
-                    logger.info("Base64 decoded data is not a binary string")
+                with self.span('load'), open(image_path, 'rb') as f:
+                    image_bytes = f.read()
+            except OSError as e:
+                raise ImageLoadError(f"Cannot load image {image_path}: {e}")
+        with self.span('cache'):
+            key = self.cache.key(image_bytes, self.options)
+            result = self.cache.get(key)
+        if result is not None:
+            logger.debug(f"Decode cache hit for {self._label(image_path)}")
+            return result
+
+        try:
+            result = ScanResult(*self._scan_image(image_bytes))
+        except ImageLoadError:
+            raise ImageLoadError(f"Cannot load image {self._label(image_path)}: "
+                                 f"not a recognized image file") from None
+        with self.span('cache'):
+            self.cache.put(key, result)
+        return result
+
+    def _grayscale(self, image_path: Union[str, Path, bytes]) -> Image.Image:
+        """Load the full-resolution image as grayscale."""
+        image = self._load(image_path)
+        with self.span('preprocess'):
+            return image.convert('L')
+
+    def _scan_image(self, image_path: Union[str, Path, bytes]) -> Tuple[List[Decoded], PreprocessStage]:
+        """Run the preprocessing stages in order and return the symbols from the first hit."""
+        from pyzbar.pyzbar import decode as pyzbar_decode
+
+        budget = self.options.time_budget
+        deadline = None if budget is None else time.perf_counter() + budget
+        full_gray = None
+        stages = self.options.stages
+        index = 0
+        while index < len(stages):
+            stage = stages[index]
+            # The first stage always runs; later ones only while the budget lasts
+            if deadline is not None and index and time.perf_counter() > deadline:
+                raise QRCodeNotFoundError(f"No QR code found within the {budget:g} s time budget")
+            index += 1
+            scale = 1.0
+            if stage in LADDER_STAGES:
+                run = [stage]
+                while index < len(stages) and stages[index] in LADDER_STAGES:
+                    run.append(stages[index])
+                    index += 1
+                if full_gray is None:
+                    full_gray = self._grayscale(image_path)
+                # Candidates are prepared and scanned together in worker threads
+                with self.span('scan'):
+                    found = self._scan_ladder(full_gray, run, deadline)
+                if found:
+                    return found
+                continue
+            elif stage is PreprocessStage.ROI:
+                if full_gray is None:
+                    full_gray = self._grayscale(image_path)
+                decoded_objects = self._scan_regions(full_gray)
+                if decoded_objects:
+                    logger.debug(f"{len(decoded_objects)} QR codes found at stage 'roi'")
+                    return decoded_objects, stage
+                logger.debug("No QR code at stage 'roi'")
+                continue
+            elif stage is PreprocessStage.DOWNSCALE:
+                reduced = self._downscale(image_path)
+                if reduced is None:
+                    continue
+                image, scale = reduced
+            elif stage is PreprocessStage.ORIGINAL:
+                image = self._load(image_path)
             else:
-                logger.info("Using raw data as non-base64 content")
+                if full_gray is None:
+                    full_gray = self._grayscale(image_path)
+                if stage is PreprocessStage.GRAYSCALE:
+                    image = full_gray
+                else:
+                    with self.span('preprocess'):
+                        image = self._binarize(full_gray)
+
+            with self.span('scan'):
+                decoded_objects = pyzbar_decode(image)
+            if decoded_objects:
+                logger.debug(f"QR code found at stage '{stage.value}' ({image.size[0]}x{image.size[1]})")
+                if scale != 1.0:
+                    decoded_objects = [self._offset(obj, 0, 0, scale) for obj in decoded_objects]
+                return decoded_objects, stage
+            logger.debug(f"No QR code at stage '{stage.value}'")
+
+        raise QRCodeNotFoundError("No QR code found in image")
+
+    def read_chunks(self, image_path: Union[str, Path]) -> List[Chunk]:
+        """Return the chunked-sequence symbols found in an image."""
+        chunks = []
+        for obj in self._scan(image_path).symbols:
+            data = obj.data
+            if len(data) < CHUNK_HEADER.size or not data.startswith(CHUNK_MAGIC):
+                logger.warning(f"Skipping non-chunk QR code in {image_path}")
+                continue
+            _, version, index, total, digest = CHUNK_HEADER.unpack_from(data)
+            if version != CHUNK_VERSION:
+                logger.warning(f"Skipping chunk with unsupported header version {version} in {image_path}")
+                continue
+            chunks.append(Chunk(index, total, digest, data[CHUNK_HEADER.size:], Path(image_path)))
+        return chunks
+
+    def _content(self, obj: Decoded, data_format: DataFormat, scan: ScanResult) -> QRContent:
+        """Run one symbol through the payload pipeline."""
+        with self.span('classify'):
+            qr_data = obj.data
+            payload_kind, decoded_data = self._classify_payload(qr_data)
+            logger.info(f"Detected {payload_kind.name.lower().replace('_', ' ')} payload")
+            logger.debug(f"Decoded {len(qr_data)} QR bytes to {len(decoded_data)} bytes")
+            header, decoded_data = self._parse_header(decoded_data)
+            if header:
+                logger.info(f"File header: extension '{header.extension}'"
+                            + (f", {header.size} bytes" if header.size is not None else "")
+                            + (f", {header.compression}-compressed" if header.compression else ""))
 
-            # Return the QR content
             return QRContent(
                 raw_data=qr_data,
-                is_base64=self._is_base64(qr_data),
+                is_base64=payload_kind in (PayloadKind.BASE64, PayloadKind.BASE64_BIT_STRING),
                 decoded_data=decoded_data,
-                data_format=data_format
+                data_format=data_format,
+                payload_kind=payload_kind,
+                stage=scan.stage,
+                rect=obj.rect,
+                polygon=list(obj.polygon),
+                cached=scan.cached,
+                header=header
             )
 
+    def _start_timing(self, image_path: Union[str, Path, bytes]) -> Optional[StageTimings]:
+        """Open a timing record for an image when a timer is attached."""
+        return self.timer.start(self._label(image_path)) if self.timer else None
+
+    def decode(self, image_path: Union[str, Path, bytes], data_format: DataFormat) -> QRContent:
+        """Decode QR code from an image file or in-memory image bytes."""
+        logger.info(f"Processing image: {self._label(image_path)}")
+        timings = self._start_timing(image_path)
+
+        try:
+            # Load and decode QR code
+            scan = self._scan(image_path)
+            if timings:
+                timings.stage = scan.stage
+            logger.info(f"QR code found at preprocessing stage: {scan.stage.value}"
+                        + (" (cached)" if scan.cached else ""))
+            return self._content(scan.symbols[0], data_format, scan)
+
         except Exception as e:
+            if timings:
+                timings.success = False
             raise QRDecoderError(f"Failed to decode QR code: {str(e)}")
 
+    def decode_all(self, image_path: Union[str, Path, bytes], data_format: DataFormat) -> List[QRContent]:
+        """Decode every QR code in an image, in reading order (top to bottom, left to right)."""
+        logger.info(f"Processing image: {self._label(image_path)}")
+        timings = self._start_timing(image_path)
+
+        try:
+            scan = self._scan(image_path)
+            if timings:
+                timings.stage = scan.stage
+            logger.info(f"{len(scan.symbols)} QR codes found at preprocessing stage: {scan.stage.value}"
+                        + (" (cached)" if scan.cached else ""))
+            decoded_objects = sorted(scan.symbols, key=lambda obj: (obj.rect.top, obj.rect.left))
+            return [self._content(obj, data_format, scan) for obj in decoded_objects]
+
+        except Exception as e:
+            if timings:
+                timings.success = False
+            raise QRDecoderError(f"Failed to decode QR codes: {str(e)}")
+
 
 class FileWriter:
     """Handles writing decoded data to files."""
 
     @staticmethod
-    def write(content: QRContent, output_path: Union[str, Path], binary_mode: bool) -> None:
-        """Write decoded content to file."""
+    def _text_blocks(content: QRContent) -> Iterator[str]:
+        """Yield the payload as UTF-8 text, decoding incrementally across block boundaries."""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for block in content.iter_data():
+            yield decoder.decode(block)
+        yield decoder.decode(b'', final=True)
+
+    @staticmethod
+    def output_path_for(content: QRContent, output_path: Union[str, Path]) -> Path:
+        """Give an output path without a suffix the extension recorded in the payload header."""
         output_path = Path(output_path)
+        extension = content.header.extension if content.header else ''
+        if not output_path.suffix and SAFE_EXTENSION.fullmatch(extension):
+            return output_path.with_name(output_path.name + extension)
+        return output_path
+
+    @staticmethod
+    def write(content: QRContent, output_path: Union[str, Path], binary_mode: bool) -> Optional[Path]:
+        """Write decoded content to file, or to stdout when output_path is '-'.
+
+        Returns the path written, which gains the header's extension when
+        output_path has none. A payload that fails its header check is removed.
+        """
+        if str(output_path) == '-':
+            FileWriter.write_stdout(content, binary_mode)
+            return None
+
+        output_path = FileWriter.output_path_for(content, output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
         if binary_mode:
             try:
-                binary_data = content.decoded_data
                 with open(output_path, 'wb') as f:
-                    f.write(binary_data)
+                    for block in content.iter_data():
+                        f.write(block)
                 logger.info(f"File successfully written to {output_path}")
+            except QRDecoderError as e:
+                output_path.unlink(missing_ok=True)
+                raise IOError(f"Failed to write binary file: {str(e)}")
             except Exception as e:
                 raise IOError(f"Failed to write binary file: {str(e)}")
         else:
             mode = 'w'
             try:
                 with open(output_path, mode) as f:
-                    f.write(content.decoded_data.decode('utf-8'))
+                    for text in FileWriter._text_blocks(content):
+                        f.write(text)
                 logger.info(f"Successfully wrote file: {output_path}")
+            except QRDecoderError as e:
+                output_path.unlink(missing_ok=True)
+                raise IOError(f"Failed to write file: {str(e)}")
             except Exception as e:
                 raise IOError(f"Failed to write file: {str(e)}")
+        return output_path
+
+    @staticmethod
+    def write_stdout(content: QRContent, binary_mode: bool) -> None:
+        """Stream the payload bytes to stdout for use in shell pipelines."""
+        try:
+            # Text mode validates each block as UTF-8 without re-encoding the payload
+            validator = None if binary_mode else codecs.getincrementaldecoder('utf-8')()
+            written = 0
+            for block in content.iter_data():
+                if validator:
+                    validator.decode(block)
+                sys.stdout.buffer.write(block)
+                written += len(block)
+            if validator:
+                validator.decode(b'', final=True)
+            sys.stdout.buffer.flush()
+            logger.debug(f"Wrote {written} bytes to stdout")
+        except Exception as e:
+            raise IOError(f"Failed to write to stdout: {str(e)}")
+
+
+class BatchResult(NamedTuple):
+    """Outcome of decoding a single image in batch mode."""
+    input_path: Path
+    output_path: Path
+    success: bool
+    error: Optional[str] = None
+    stage: Optional[PreprocessStage] = None
+    cached: bool = False
+    timings: Optional[StageTimings] = None
+
+
+# Per-process decoder, created once by the pool initializer
+_worker_decoder: Optional[QRDecoder] = None
+
+
+def _set_worker_decoder(options: Optional[PreprocessOptions],
+                        cache: Optional[DecodeCache], timed: bool = False) -> None:
+    """Create the decoder used by the batch helpers in this process."""
+    global _worker_decoder
+    _worker_decoder = QRDecoder(options, cache, StageTimer() if timed else None)
+
+
+def _init_batch_worker(log_level: int, options: Optional[PreprocessOptions],
+                       cache: Optional[DecodeCache], timed: bool = False) -> None:
+    """Initialize a batch worker process."""
+    configure_logging()
+    logger.setLevel(log_level)
+    _set_worker_decoder(options, cache, timed)
+
+
+def _take_timings(decoder: QRDecoder, success: bool = True) -> List[StageTimings]:
+    """Collect the timing records of the work this process just finished."""
+    records = decoder.timer.drain() if decoder.timer else []
+    if not success:
+        for record in records:
+            record.success = False
+    return records
+
+
+def _decode_batch_item(item: Tuple[Path, Path, bool]) -> BatchResult:
+    """Decode one image and write its output, capturing any failure."""
+    image_path, output_path, binary_mode = item
+    decoder = _worker_decoder or QRDecoder()
+    data_format = DataFormat.BINARY if binary_mode else DataFormat.TEXT
+    try:
+        content = decoder.decode(image_path, data_format)
+        with decoder.span('write'):
+            output_path = FileWriter.write(content, output_path, binary_mode=binary_mode)
+        timings = _take_timings(decoder)
+        return BatchResult(image_path, output_path, success=True, stage=content.stage,
+                           cached=content.cached, timings=timings[-1] if timings else None)
+    except Exception as e:
+        timings = _take_timings(decoder, success=False)
+        return BatchResult(image_path, output_path, success=False, error=str(e),
+                           timings=timings[-1] if timings else None)
+
+
+class BatchDecoder:
+    """Decodes many images across a pool of worker processes."""
+
+    def __init__(self, workers: Optional[int] = None, log_level: int = logging.WARNING,
+                 options: Optional[PreprocessOptions] = None, cache: Optional[DecodeCache] = None,
+                 timed: bool = False):
+        self.workers = workers or os.cpu_count() or 1
+        self.log_level = log_level
+        self.options = options
+        self.cache = cache
+        self.timed = timed
+
+    @staticmethod
+    def collect_inputs(source: Union[str, Path]) -> List[Path]:
+        """Resolve a directory, glob pattern or newline-delimited manifest to image paths."""
+        path = Path(source)
+        if path.is_dir():
+            return sorted(p for p in path.iterdir()
+                          if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES)
+        if path.is_file():
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                return [path]
+            # Anything else is a manifest, one image path per line
+            with open(path, 'r') as f:
+                return [Path(line.strip()) for line in f
+                        if line.strip() and not line.lstrip().startswith('#')]
+        import glob
+
+        return sorted(Path(p) for p in glob.glob(str(source), recursive=True))
+
+    def run(self, image_paths: Iterable[Path], output_dir: Union[str, Path],
+            binary_mode: bool, extension: str) -> List[BatchResult]:
+        """Decode every image, writing <output_dir>/<image stem><extension>.
+
+        Images sharing a stem (label.png and label.jpg, or a/x.png and b/x.png)
+        would overwrite each other's output: the first one keeps the name and
+        the others fail without being decoded.
+        """
+        output_dir = Path(output_dir)
+        results: List[Optional[BatchResult]] = []
+        items = []
+        claimed: Dict[str, Path] = {}
+        for image_path in map(Path, image_paths):
+            output_path = output_dir / (image_path.stem + extension)
+            # Case-insensitive file systems would collide on names differing only in case
+            first = claimed.setdefault(str(output_path).casefold(), image_path)
+            if first is not image_path:
+                results.append(BatchResult(image_path, output_path, success=False,
+                                           error=f"duplicate output name {output_path.name} (also {first})"))
+            else:
+                results.append(None)
+                items.append((image_path, output_path, binary_mode))
+        if not items:
+            return results
+
+        if self.workers == 1:
+            _set_worker_decoder(self.options, self.cache, self.timed)
+            decoded = map(_decode_batch_item, items)
+            return [result or next(decoded) for result in results]
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Larger chunks amortize the inter-process round-trip on big batches
+        chunksize = max(1, len(items) // (self.workers * 4))
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_batch_worker,
+                                 initargs=(self.log_level, self.options, self.cache, self.timed)) as executor:
+            decoded = executor.map(_decode_batch_item, items, chunksize=chunksize)
+            return [result or next(decoded) for result in results]
+
+    @staticmethod
+    def summarize(results: List[BatchResult]) -> int:
+        """Log a per-file report and return the number of failures."""
+        failures = [r for r in results if not r.success]
+        for result in results:
+            if result.success:
+                logger.debug(f"OK   {result.input_path} -> {result.output_path}")
+            else:
+                logger.error(f"FAIL {result.input_path}: {result.error}")
+        logger.info(f"Batch complete: {len(results) - len(failures)} succeeded, "
+                    f"{len(failures)} failed, {len(results)} total")
+        for stage in PreprocessStage:
+            hits = sum(1 for r in results if r.stage is stage)
+            if hits:
+                logger.info(f"  decoded at stage '{stage.value}': {hits}")
+        cache_hits = sum(1 for r in results if r.cached)
+        if cache_hits:
+            logger.info(f"  served from decode cache: {cache_hits}")
+        return len(failures)
+
+
+def _read_batch_chunks(image_path: Path) -> Tuple[Path, List[Chunk], Optional[str]]:
+    """Scan one image for chunks, capturing any failure."""
+    decoder = _worker_decoder or QRDecoder()
+    try:
+        return image_path, decoder.read_chunks(image_path), None
+    except Exception as e:
+        return image_path, [], str(e)
+
+
+class ChunkReassembler:
+    """Restores a file from the chunked QR sequence produced by `encode.py chunked`."""
+
+    def __init__(self, workers: Optional[int] = None, log_level: int = logging.WARNING,
+                 options: Optional[PreprocessOptions] = None, cache: Optional[DecodeCache] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.log_level = log_level
+        self.options = options
+        self.cache = cache
+
+    def _iter_scans(self, image_paths: List[Path]) -> Iterable[Tuple[Path, List[Chunk], Optional[str]]]:
+        """Scan images concurrently, yielding results as they complete."""
+        if self.workers == 1 or len(image_paths) == 1:
+            _set_worker_decoder(self.options, self.cache)
+            yield from map(_read_batch_chunks, image_paths)
+            return
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_batch_worker,
+                                 initargs=(self.log_level, self.options, self.cache)) as executor:
+            yield from executor.map(_read_batch_chunks, image_paths)
+
+    @staticmethod
+    def _check_header(header: Optional[FileHeader], total: int) -> None:
+        """Reject a file header that disagrees with the chunk sequence it leads."""
+        if header is None or header.size is None:
+            return
+        if header.chunks != total:
+            raise ChunkReassemblyError(f"File header records {header.chunks} chunks but the sequence has {total}")
+        if header.compression:
+            raise ChunkReassemblyError(f"Compressed ({header.compression}) chunk sequences are not supported")
+
+    def reassemble(self, image_paths: Iterable[Union[str, Path]],
+                   output_path: Union[str, Path]) -> int:
+        """Decode all images and stream the restored file to output_path.
+
+        Chunks are written as soon as every lower index has been written, so
+        only out-of-order chunks are held in memory. Returns the number of
+        bytes written.
+        """
+        import hashlib
+
+        image_paths = [Path(p) for p in image_paths]
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = output_path.with_name(output_path.name + '.part')
+
+        total: Optional[int] = None
+        digest: Optional[bytes] = None
+        header: Optional[FileHeader] = None
+        pending: Dict[int, Chunk] = {}
+        seen: Dict[int, Path] = {}
+        duplicates: List[Tuple[int, Path]] = []
+        failures: List[Tuple[Path, str]] = []
+        next_index = 0
+        written = 0
+        hasher = hashlib.sha256()
+
+        try:
+            with open(partial_path, 'wb') as out:
+                for image_path, chunks, error in self._iter_scans(image_paths):
+                    if error:
+                        failures.append((image_path, error))
+                        continue
+                    for chunk in chunks:
+                        if total is None:
+                            total, digest = chunk.total, chunk.digest
+                        elif (chunk.total, chunk.digest) != (total, digest):
+                            raise ChunkReassemblyError(
+                                f"{chunk.source} belongs to a different chunked file")
+                        if chunk.index >= total:
+                            raise ChunkReassemblyError(
+                                f"{chunk.source} has chunk index {chunk.index} outside 0..{total - 1}")
+                        if chunk.index in seen:
+                            duplicates.append((chunk.index, chunk.source))
+                            continue
+                        seen[chunk.index] = chunk.source
+                        pending[chunk.index] = chunk
+
+                        # Flush every chunk that is now contiguous with what was written
+                        while next_index in pending:
+                            payload = pending.pop(next_index).payload
+                            if next_index == 0:
+                                header, payload = QRDecoder._parse_header(payload)
+                                self._check_header(header, total)
+                            out.write(payload)
+                            hasher.update(payload)
+                            written += len(payload)
+                            next_index += 1
+
+            for image_path, error in failures:
+                logger.error(f"Could not read {image_path}: {error}")
+            for index, source in duplicates:
+                logger.warning(f"Duplicate chunk {index} in {source} (first seen in {seen[index]})")
+
+            if total is None:
+                raise ChunkReassemblyError("No chunked QR codes found in the input images")
+            missing = [i for i in range(total) if i not in seen]
+            if missing:
+                raise ChunkReassemblyError(
+                    f"Missing {len(missing)} of {total} chunks: {', '.join(map(str, missing))}")
+            if hasher.digest()[:len(digest)] != digest:
+                raise ChunkReassemblyError("Reassembled file does not match its hash")
+            if header and header.size is not None and written != header.size:
+                raise ChunkReassemblyError(
+                    f"Reassembled {written} bytes but the file header records {header.size}")
+
+            if header and not output_path.suffix and SAFE_EXTENSION.fullmatch(header.extension):
+                output_path = output_path.with_name(output_path.name + header.extension)
+            os.replace(partial_path, output_path)
+            logger.info(f"Reassembled {total} chunks ({written} bytes) into {output_path}")
+            return written
+
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+
+
+def _detach(content: QRContent) -> QRContent:
+    """Copy a content's payload out of its memoryview so the record can be pickled."""
+    return content._replace(decoded_data=bytes(content.decoded_data))
+
+
+def _decode_async_item(image: Union[str, Path, bytes], data_format: DataFormat, all_codes: bool,
+                       options: PreprocessOptions, cache: Optional[DecodeCache]) -> Union[QRContent, List[QRContent]]:
+    """Process pool worker for AsyncQRDecoder: decode with this process's decoder.
+
+    Pools the caller created never ran _init_batch_worker, and may serve
+    several AsyncQRDecoders, so the decoder is (re)built whenever it was not
+    made for these options and this cache.
+    """
+    decoder = _worker_decoder
+    if (decoder is None or decoder.options != options
+            or getattr(decoder.cache, 'path', None) != getattr(cache, 'path', None)):
+        _set_worker_decoder(options, cache)
+        decoder = _worker_decoder
+    if all_codes:
+        return [_detach(content) for content in decoder.decode_all(image, data_format)]
+    return _detach(decoder.decode(image, data_format))
+
+
+class AsyncQRDecoder:
+    """Asyncio front end to QRDecoder that runs decodes in an executor, off the event loop.
+
+    The default thread executor gives each worker thread its own QRDecoder
+    (SQLite connections cannot be shared between threads); libzbar is called
+    through ctypes, which releases the GIL while it scans. executor='process'
+    also moves Pillow's preprocessing off the GIL at the cost of pickling
+    images and results; an Executor instance is used as given and left open
+    (process pools get the decoder's options and cache with every decode, so
+    theirs need no initializer). At most max_concurrency decodes are submitted at once. Cancelling a call
+    drops its queued work; a decode already running finishes in the background.
+    """
+
+    def __init__(self, decoder: Optional[QRDecoder] = None, executor: Union[str, Executor] = 'thread',
+                 max_workers: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 log_level: int = logging.WARNING):
+        if isinstance(executor, str) and executor not in ('thread', 'process'):
+            raise ValueError(f"executor must be 'thread', 'process' or an Executor, not {executor!r}")
+        self.decoder = decoder or QRDecoder()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.max_workers
+        self.log_level = log_level
+        self._kind = executor if isinstance(executor, str) else None
+        self._executor: Optional[Executor] = None if self._kind else executor
+        if self._kind:
+            self._threaded = self._kind == 'thread'
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Anything but a thread pool gets the picklable module-level worker
+            self._threaded = isinstance(executor, ThreadPoolExecutor)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._local = threading.local()
+
+    def _thread_decoder(self) -> QRDecoder:
+        """The calling worker thread's own copy of the decoder."""
+        decoder = getattr(self._local, 'decoder', None)
+        if decoder is None:
+            import copy
+
+            # Copying a DecodeCache drops its connection, so each thread opens its own
+            decoder = self._local.decoder = QRDecoder(self.decoder.options, copy.copy(self.decoder.cache),
+                                                      self.decoder.timer)
+        return decoder
+
+    def _decode_in_thread(self, image: Union[str, Path, bytes], data_format: DataFormat,
+                          all_codes: bool) -> Union[QRContent, List[QRContent]]:
+        decoder = self._thread_decoder()
+        if all_codes:
+            return decoder.decode_all(image, data_format)
+        return decoder.decode(image, data_format)
+
+    def _get_executor(self) -> Executor:
+        """Create the executor on first use."""
+        if self._executor is None:
+            if self._kind == 'process':
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=_init_batch_worker,
+                    initargs=(self.log_level, self.decoder.options, self.decoder.cache))
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='qr-decode')
+        return self._executor
+
+    async def _run(self, image: Union[str, Path, bytes], data_format: DataFormat,
+                   all_codes: bool) -> Union[QRContent, List[QRContent]]:
+        import asyncio
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            if self._threaded:
+                future = self._get_executor().submit(self._decode_in_thread, image, data_format, all_codes)
+            else:
+                future = self._get_executor().submit(_decode_async_item, image, data_format, all_codes,
+                                                     self.decoder.options, self.decoder.cache)
+            # Cancelling the awaiting task cancels the executor future too
+            return await asyncio.wrap_future(future)
+
+    async def decode(self, image: Union[str, Path, bytes],
+                     data_format: DataFormat = DataFormat.BINARY) -> QRContent:
+        """Decode the QR code in an image file or in-memory image bytes."""
+        return await self._run(image, data_format, all_codes=False)
+
+    async def decode_all(self, image: Union[str, Path, bytes],
+                         data_format: DataFormat = DataFormat.BINARY) -> List[QRContent]:
+        """Decode every QR code in an image, in reading order."""
+        return await self._run(image, data_format, all_codes=True)
+
+    async def decode_many(self, images: Iterable[Union[str, Path, bytes]],
+                          data_format: DataFormat = DataFormat.BINARY,
+                          return_exceptions: bool = False) -> List[Union[QRContent, BaseException]]:
+        """Decode many images concurrently, returning their contents in input order.
+
+        The first failure cancels the remaining decodes and is raised, unless
+        return_exceptions is set, in which case failures take their image's place.
+        """
+        import asyncio
+
+        tasks = [asyncio.ensure_future(self.decode(image, data_format)) for image in images]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def close(self) -> None:
+        """Shut down the executor this instance created, cancelling queued work."""
+        import asyncio
+
+        if self._kind and self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: executor.shutdown(wait=True, cancel_futures=True))
+
+    async def __aenter__(self) -> AsyncQRDecoder:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def _decode_request(image_bytes: bytes, all_codes: bool) -> Tuple[List[dict], List[StageTimings]]:
+    """Server worker: decode posted image bytes into JSON-ready symbol records and their stage timings."""
+    import base64
+
+    decoder = _worker_decoder or QRDecoder()
+    try:
+        if all_codes:
+            contents = decoder.decode_all(image_bytes, DataFormat.BINARY)
+        else:
+            contents = [decoder.decode(image_bytes, DataFormat.BINARY)]
+        # Materializing the payloads decompresses and checks them, as writing a file would
+        with decoder.span('write'):
+            symbols = [{
+                'data': base64.b64encode(content.data).decode('ascii'),
+                'payload_kind': content.payload_kind.name.lower(),
+                'compression': content.compression,
+                'extension': content.header.extension if content.header else None,
+                'stage': content.stage.value,
+                'cached': content.cached,
+                'rect': list(content.rect),
+                'polygon': [list(point) for point in content.polygon],
+            } for content in contents]
+    except Exception:
+        _take_timings(decoder, success=False)
+        raise
+    return symbols, _take_timings(decoder)
+
+
+def _server_classes() -> Tuple[type, type]:
+    """Return the DecodeRequestHandler and DecodeServer classes, defining them on first use.
+
+    Only --serve needs http.server and the email package behind it, so the
+    classes are built when a server starts instead of at import.
+    """
+    global DecodeRequestHandler, DecodeServer
+    if 'DecodeServer' in globals():
+        return DecodeRequestHandler, DecodeServer
+
+    import base64
+    from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class DecodeRequestHandler(BaseHTTPRequestHandler):
+        """HTTP front end of the decode server.
+
+        POST /decode with the raw image as the request body. The response is JSON
+        ({"symbols": [...]}, payloads base64 encoded) or, with ?format=binary, the
+        payload bytes of the first symbol. ?all=1 returns every symbol in the image.
+        GET /health reports the number of requests in flight.
+        """
+
+        server: 'DecodeServer'
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self, status: int, body: bytes, content_type: str = 'application/json',
+                     headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _respond_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+            self._respond(status, json.dumps(payload).encode('utf-8'), headers=headers)
+
+        def do_GET(self) -> None:
+            if urlparse(self.path).path != '/health':
+                self._respond_json(404, {'error': 'Not found'})
+                return
+            self._respond_json(200, {'status': 'ok', 'in_flight': self.server.in_flight,
+                                     'capacity': self.server.capacity})
+
+        def do_POST(self) -> None:
+            url = urlparse(self.path)
+            if url.path != '/decode':
+                self._respond_json(404, {'error': 'Not found'})
+                return
+            query = parse_qs(url.query)
+            all_codes = query.get('all', ['0'])[0] in ('1', 'true')
+            binary = query.get('format', ['json'])[0] == 'binary'
+
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # The body cannot be framed, so the connection cannot be reused either
+                self._respond_json(400, {'error': 'Invalid Content-Length header'})
+                self.close_connection = True
+                return
+            if length == 0:
+                self._respond_json(400, {'error': 'Request body must contain the image bytes'})
+                return
+            if length > MAX_REQUEST_BYTES:
+                self._respond_json(413, {'error': f'Image larger than {MAX_REQUEST_BYTES} bytes'})
+                self.close_connection = True
+                return
+
+            # Backpressure: refuse instead of queueing without bound
+            if not self.server.acquire_slot():
+                self._respond_json(503, {'error': 'Server busy'}, headers={'Retry-After': '1'})
+                self.close_connection = True
+                return
+            try:
+                image_bytes = self.rfile.read(length)
+                future = self.server.executor.submit(_decode_request, image_bytes, all_codes)
+            except Exception:
+                self.server.release_slot()
+                raise
+            # The slot stays taken until the decode is over, even if this request gives up on it
+            future.add_done_callback(lambda _: self.server.release_slot())
+            try:
+                symbols, timings = future.result(timeout=self.server.request_timeout)
+            except FutureTimeoutError:
+                # Only a decode still waiting in the queue can be called off
+                future.cancel()
+                self._respond_json(504, {'error': f'Decode took longer than {self.server.request_timeout} s'})
+                self.close_connection = True
+                return
+            except QRDecoderError as e:
+                self._respond_json(422, {'error': str(e)})
+                return
+            except Exception as e:
+                logger.error(f"Decode request failed: {e}")
+                self._respond_json(500, {'error': str(e)})
+                return
+
+            if binary:
+                self._respond(200, base64.b64decode(symbols[0]['data']), 'application/octet-stream')
+            else:
+                self._respond_json(200, {'symbols': symbols})
+            if self.server.timings:
+                self.server.timings.add(timings)
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(f"{self.address_string()} - {format % args}")
+
+
+    class DecodeServer(ThreadingHTTPServer):
+        """Long-running decode server with warm decoders in a worker process pool.
+
+        At most workers + queue_size requests are accepted at once; the rest are
+        turned away with 503 so callers can back off. A request whose decode runs
+        past request_timeout seconds gets 504 but keeps its slot until the decode
+        ends. An Executor passed as executor is used as given and left open.
+        """
+
+        daemon_threads = True
+
+        def __init__(self, address: Tuple[str, int], workers: Optional[int] = None, queue_size: int = 16,
+                     log_level: int = logging.WARNING, options: Optional[PreprocessOptions] = None,
+                     cache: Optional[DecodeCache] = None, timings: Optional[TimingReport] = None,
+                     request_timeout: float = REQUEST_TIMEOUT, executor: Optional[Executor] = None):
+            super().__init__(address, DecodeRequestHandler)
+            self.workers = workers or os.cpu_count() or 1
+            self.capacity = self.workers + queue_size
+            self.in_flight = 0
+            self.timings = timings
+            self.request_timeout = request_timeout
+            self._slots_lock = threading.Lock()
+            self._owns_executor = executor is None
+            if executor is not None:
+                self.executor = executor
+                return
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                initializer=_init_batch_worker,
+                                                initargs=(log_level, options, cache, timings is not None))
+            # Start every worker now so the first requests do not pay for it
+            list(self.executor.map(abs, range(self.workers)))
+
+        def acquire_slot(self) -> bool:
+            """Reserve capacity for one request; False if the server is saturated."""
+            with self._slots_lock:
+                if self.in_flight >= self.capacity:
+                    return False
+                self.in_flight += 1
+                return True
+
+        def release_slot(self) -> None:
+            with self._slots_lock:
+                self.in_flight -= 1
+
+        def server_close(self) -> None:
+            super().server_close()
+            if self._owns_executor:
+                self.executor.shutdown(cancel_futures=True)
+
+    return DecodeRequestHandler, DecodeServer
+
+
+def __getattr__(name: str):
+    # `decoder.DecodeServer` and friends still work for importers; see _server_classes
+    if name in ('DecodeRequestHandler', 'DecodeServer'):
+        _server_classes()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="QR Code Decoder")
-    parser.add_argument('-i', '--input', required=True, help="Input image path")
-    parser.add_argument('-o', '--output', required=True, help="Output file path")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-i', '--input', help="Input image path ('-' reads image bytes from stdin)")
+    source.add_argument('--batch', metavar='SOURCE',
+                        help="Directory, glob pattern or manifest file of input images")
+    source.add_argument('--serve', metavar='[HOST:]PORT', nargs='?', const=str(DEFAULT_SERVE_PORT),
+                        help=f"Run an HTTP decode server (default: 127.0.0.1:{DEFAULT_SERVE_PORT})")
+    parser.add_argument('-o', '--output',
+                        help="Output file path, '-' for stdout (output directory in batch mode)")
     parser.add_argument('-b', '--binary', action='store_true', help="Binary output mode")
+    parser.add_argument('-a', '--all', action='store_true',
+                        help="Write every QR code in the input image to its own file: <output>_000.ext, ...")
+    parser.add_argument('-r', '--reassemble', action='store_true',
+                        help="Restore one file from a chunked QR sequence (output is a file path)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Worker processes for batch and reassemble modes (default: CPU count)")
+    parser.add_argument('-q', '--queue-size', type=int, default=16,
+                        help="Requests the server queues beyond its workers before answering 503 (default: 16)")
+    parser.add_argument('-e', '--ext', default=None,
+                        help="Output file extension in batch mode (default: .bin or .txt)")
+    parser.add_argument('--stages', default='downscale,grayscale',
+                        help="Comma-separated preprocessing stages tried in order: "
+                             + ", ".join(s.value for s in PreprocessStage)
+                             + "; 'ladder' is " + STAGE_PRESETS['ladder'] + " (default: downscale,grayscale)")
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help="Give up on an image once its stages have taken this long; ladder scans still running "
+                             "finish on the decoder's bounded ladder pool (default: no limit)")
+    parser.add_argument('--max-dimension', type=int, default=DEFAULT_MAX_DIMENSION,
+                        help="Longest side of the image used by the downscale stage (default: %(default)s)")
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help="Directory of the decode cache (default: %(default)s)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help="Maximum decode cache size in MB (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the decode cache")
+    parser.add_argument('--timings', choices=('json', 'table'), default=None,
+                        help="Report time spent per stage (" + ", ".join(TIMING_STAGES) + "): "
+                             "a JSON line per image, or a summary table at exit")
+    parser.add_argument('--timings-file', default='-',
+                        help="File the timings are appended to (default: stderr)")
+    parser.add_argument('--profile', metavar='PATH', nargs='?', const='-', default=None,
+                        help="Run under cProfile and save the stats to PATH, or print the top functions "
+                             "to stderr if no PATH is given (worker processes are not profiled; use -j 1)")
     parser.add_argument('-v', '--verbose', action='store_true', help="Verbose logging")
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.all and (args.batch or args.reassemble):
+        parser.error("-a/--all works on a single -i input image")
+    if args.timings and args.reassemble:
+        parser.error("--timings is not supported with -r/--reassemble")
+    if args.serve is None and not args.output:
+        parser.error("the following arguments are required: -o/--output")
+    if args.output == '-' and (args.all or args.batch):
+        parser.error("-o - (stdout) takes a single output; it cannot be used with -a/--all or --batch")
+    if args.output == '-' and args.reassemble:
+        parser.error("-o - (stdout) cannot be used with -r/--reassemble, which checks the whole file "
+                     "before it is written; give an output file path")
+    return args
+
+
+def preprocess_options(args: argparse.Namespace) -> PreprocessOptions:
+    """Build preprocessing options from the command line."""
+    try:
+        names = STAGE_PRESETS.get(args.stages.strip(), args.stages)
+        stages = tuple(PreprocessStage(name.strip()) for name in names.split(',') if name.strip())
+    except ValueError as e:
+        raise QRDecoderError(f"Unknown preprocessing stage: {e}")
+    if not stages:
+        raise QRDecoderError("At least one preprocessing stage is required")
+    if args.time_budget is not None and args.time_budget <= 0:
+        raise QRDecoderError("--time-budget must be positive")
+    return PreprocessOptions(stages=stages, max_dimension=args.max_dimension, time_budget=args.time_budget)
+
+
+def decode_cache(args: argparse.Namespace) -> Optional[DecodeCache]:
+    """Build the decode cache from the command line, or None if disabled."""
+    if args.no_cache:
+        return None
+    return DecodeCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+
+def timing_report(args: argparse.Namespace) -> Optional[TimingReport]:
+    """Build the stage timing report from the command line, or None if not requested."""
+    if not args.timings:
+        return None
+    stream = sys.stderr if args.timings_file == '-' else open(args.timings_file, 'a')
+    return TimingReport(args.timings, stream)
+
+
+@contextlib.contextmanager
+def reported_timings(decoder: QRDecoder, report: Optional[TimingReport]) -> Iterator[None]:
+    """Pass the decoder's timing records to the report when the block ends, marked failed on error."""
+    if report is None:
+        yield
+        return
+    try:
+        yield
+    except BaseException:
+        report.add(_take_timings(decoder, success=False))
+        raise
+    report.add(_take_timings(decoder))
+
+
+def write_profile(profiler: cProfile.Profile, path: str) -> None:
+    """Save the profile stats to path, or print the most expensive functions to stderr for '-'."""
+    if path == '-':
+        import pstats
+
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(PROFILE_TOP)
+    else:
+        profiler.dump_stats(path)
+        logger.info(f"Profile written to {path} (inspect with: python -m pstats {path})")
+
+
+def numbered_path(output_path: Union[str, Path], index: int) -> Path:
+    """Return <stem>_<index><suffix> for one of several outputs."""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}_{index:03d}{output_path.suffix}")
+
+
+def read_input(args: argparse.Namespace) -> Union[str, bytes]:
+    """Return the -i image path, or the image bytes when reading from stdin."""
+    return sys.stdin.buffer.read() if args.input == '-' else args.input
+
+
+def run_single(args: argparse.Namespace, report: Optional[TimingReport]) -> int:
+    """Decode the QR code in one image."""
+    decoder = QRDecoder(preprocess_options(args), decode_cache(args), StageTimer() if report else None)
+    data_format = DataFormat.BINARY if args.binary else DataFormat.TEXT
+
+    with reported_timings(decoder, report):
+        # Decode QR code
+        content = decoder.decode(read_input(args), data_format)
+
+        # Write output
+        with decoder.span('write'):
+            FileWriter.write(content, args.output, binary_mode=args.binary)
+    return 0
+
+
+def run_all(args: argparse.Namespace, report: Optional[TimingReport]) -> int:
+    """Decode every QR code in one image into numbered output files."""
+    decoder = QRDecoder(preprocess_options(args), decode_cache(args), StageTimer() if report else None)
+    data_format = DataFormat.BINARY if args.binary else DataFormat.TEXT
+
+    with reported_timings(decoder, report):
+        contents = decoder.decode_all(read_input(args), data_format)
+        for index, content in enumerate(contents):
+            output_path = numbered_path(args.output, index)
+            rect = content.rect
+            logger.info(f"QR code {index} at ({rect.left}, {rect.top}) {rect.width}x{rect.height}")
+            with decoder.span('write'):
+                FileWriter.write(content, output_path, binary_mode=args.binary)
+    return 0
+
+
+def run_reassemble(args: argparse.Namespace) -> int:
+    """Restore a single file from a chunked QR sequence."""
+    if args.input == '-':
+        logger.error("Reassembly needs image files; it cannot read from stdin")
+        return 1
+    image_paths = BatchDecoder.collect_inputs(args.batch) if args.batch else [Path(args.input)]
+    if not image_paths:
+        logger.error(f"No input images found for: {args.batch}")
+        return 1
+
+    worker_level = logging.DEBUG if args.verbose else logging.WARNING
+    reassembler = ChunkReassembler(workers=args.jobs, log_level=worker_level,
+                                   options=preprocess_options(args), cache=decode_cache(args))
+    reassembler.reassemble(image_paths, args.output)
+    return 0
+
+
+def run_serve(args: argparse.Namespace, report: Optional[TimingReport]) -> int:
+    """Run the decode server until interrupted."""
+    host, _, port = args.serve.rpartition(':')
+    worker_level = logging.DEBUG if args.verbose else logging.WARNING
+    _, server_class = _server_classes()
+    server = server_class((host or '127.0.0.1', int(port)), workers=args.jobs,
+                          queue_size=args.queue_size, log_level=worker_level,
+                          options=preprocess_options(args), cache=decode_cache(args), timings=report)
+    logger.info(f"Decode server listening on http://{server.server_address[0]}:{server.server_address[1]} "
+                f"with {server.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down decode server")
+    finally:
+        server.server_close()
+    return 0
+
+
+def run_batch(args: argparse.Namespace, report: Optional[TimingReport]) -> int:
+    """Decode every image in a batch source."""
+    image_paths = BatchDecoder.collect_inputs(args.batch)
+    if not image_paths:
+        logger.error(f"No input images found for: {args.batch}")
+        return 1
+
+    extension = args.ext or ('.bin' if args.binary else '.txt')
+    worker_level = logging.DEBUG if args.verbose else logging.WARNING
+    batch = BatchDecoder(workers=args.jobs, log_level=worker_level, options=preprocess_options(args),
+                         cache=decode_cache(args), timed=report is not None)
+    logger.info(f"Decoding {len(image_paths)} images with {batch.workers} workers")
+
+    results = batch.run(image_paths, args.output, args.binary, extension)
+    if report:
+        report.add(r.timings for r in results if r.timings)
+    return 1 if BatchDecoder.summarize(results) else 0
+
+
+def run(args: argparse.Namespace, report: Optional[TimingReport]) -> int:
+    """Run the mode selected on the command line."""
+    if args.serve:
+        return run_serve(args, report)
+
+    if args.reassemble:
+        return run_reassemble(args)
+
+    if args.all:
+        return run_all(args, report)
+
+    if args.batch:
+        return run_batch(args, report)
+
+    return run_single(args, report)
 
 
 def main() -> int:
     """Main entry point."""
+    configure_logging()
     try:
         args = parse_arguments()
 
         if args.verbose:
             logger.setLevel(logging.DEBUG)
 
-        decoder = QRDecoder()
-        data_format = DataFormat.BINARY if args.binary else DataFormat.TEXT
+        report = timing_report(args)
+        profiler = None
+        if args.profile:
+            import cProfile
 
-        # Decode QR code
-        content = decoder.decode(args.input, data_format)
-
-        # Write output
-        FileWriter.write(content, args.output, binary_mode=args.binary)
-
-        return 0
+            profiler = cProfile.Profile()
+        try:
+            if profiler:
+                return profiler.runcall(run, args, report)
+            return run(args, report)
+        finally:
+            if profiler:
+                write_profile(profiler, args.profile)
+            if report:
+                report.close()
 
     except Exception as e:
         logger.error(f"Error: {str(e)}")
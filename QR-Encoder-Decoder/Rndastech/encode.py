@@ -1,57 +1,1000 @@
+import io
 import sys
 import os
+import re
+import csv
+import json
+import lzma
+import mmap
+import time
+import zlib
+import struct
+import hashlib
+import tarfile
+import zipfile
+import argparse
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from itertools import chain, islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import qrcode
+from qrcode import base, util
 from PIL import Image
 
-def encode_to_qr(input_file, output_image):
-    """Encodes the contents of the input file into a QR code image with file extension metadata."""
-    if not os.path.exists(input_file):
-        print(f"Error: The file '{input_file}' does not exist.")
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_L  # Low error correction for maximum data
+MASK_PATTERNS = range(8)
+BOX_SIZE = 10  # Pixels per module
+BORDER = 4  # Quiet zone in modules
+
+
+def segment_bits(mode, length):
+    """Returns the data bits for length characters in mode, without the mode and count fields."""
+    if mode == util.MODE_NUMBER:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if mode == util.MODE_ALPHA_NUM:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def build_capacity_table():
+    """Returns {(mode, error correction): capacities for versions 1-40} for single-segment data."""
+    table = {}
+    for ecc in range(len(util.BIT_LIMIT_TABLE)):
+        for mode in (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE):
+            capacities = []
+            for version in range(1, 41):
+                available = util.BIT_LIMIT_TABLE[ecc][version] - 4 - util.length_in_bits(mode, version)
+                # Largest length that fits, also bounded by what the count field can hold
+                length = min(available * 3 // 10 + 2, (1 << util.length_in_bits(mode, version)) - 1)
+                while segment_bits(mode, length) > available:
+                    length -= 1
+                capacities.append(length)
+            table[mode, ecc] = tuple(capacities)
+    return table
+
+
+CAPACITY = build_capacity_table()
+MAX_BINARY_SIZE = CAPACITY[util.MODE_8BIT_BYTE, ERROR_CORRECTION][-1]  # 2953 bytes at Version 40, level L
+MAX_QR_CHARACTERS = CAPACITY[util.MODE_NUMBER, ERROR_CORRECTION][-1]  # 7089: no larger input fits, even all digits
+
+# Chunk header: magic, format version, sequence index, total count, file hash
+CHUNK_MAGIC = b'QRCH'
+CHUNK_VERSION = 1
+CHUNK_HEADER = struct.Struct('>4sBHH16s')
+CHUNK_PAYLOAD_SIZE = MAX_BINARY_SIZE - CHUNK_HEADER.size
+
+# File header leading every payload: magic, header version, compression codec (0 is none),
+# original file size, truncated SHA-256 of the file, chunk count, extension length;
+# the extension follows. A single QR code is a sequence of one chunk.
+FILE_MAGIC = b'QRF'
+FILE_HEADER_VERSION = 1
+FILE_HEADER = struct.Struct('>3sBBI8sHB')
+COMPRESSION_CODECS = {'zlib': 1, 'lzma': 2, 'zstd': 3}
+
+# Formats written straight from the module matrix
+OUTPUT_FORMATS = ('png', 'svg', 'pbm')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Batch command: manifest formats by extension, rows per worker task, progress report interval,
+# archive outputs by suffix and the characters allowed in image names
+MANIFEST_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+BATCH_SIZE = 64
+PROGRESS_INTERVAL = 1000
+TAR_MODES = {'.tar': 'w', '.tar.gz': 'w:gz', '.tgz': 'w:gz'}
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+# Symbol cache: in-memory budget and key format (bump when rendering changes the output)
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+SYMBOL_CACHE_FORMAT = 1
+
+
+def build_header(input_file, size, digest, codec=None, chunks=1):
+    """Returns the file header for a file of size bytes with the given SHA-256 digest."""
+    extension = os.path.splitext(input_file)[1].encode('utf-8')[:255]
+    return FILE_HEADER.pack(FILE_MAGIC, FILE_HEADER_VERSION, COMPRESSION_CODECS.get(codec, 0),
+                            size, digest[:8], chunks, len(extension)) + extension
+
+
+def status_stream(output_image):
+    """Status messages go to stderr when the image itself is written to stdout."""
+    return sys.stderr if output_image == '-' else sys.stdout
+
+
+@contextmanager
+def open_input(input_file):
+    """Yields the input as a read-only buffer: a memory map of the file, or stdin's bytes for '-'.
+
+    Mapping lets the file be sized, hashed, compressed and sliced without
+    reading it into memory. Empty files cannot be mapped and yield b''.
+    """
+    if input_file == '-':
+        yield sys.stdin.buffer.read()
         return
+    with open(input_file, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def output_format(output_image, fmt=None):
+    """Returns the output format: explicit, from the extension, or PNG (as qrcode always wrote)."""
+    if fmt:
+        return fmt
+    extension = os.path.splitext(output_image)[1].lower().lstrip('.')
+    return extension if extension in OUTPUT_FORMATS else 'png'
+
+
+def pixel_rows(qr, dark, light):
+    """Returns the packed 1-bit pixel rows of one module row each (quiet zone included), and the image width.
+
+    Every module becomes box_size copies of its bit, so a row is built as one
+    bit string and packed with a single int() call.
+    """
+    box, border = qr.box_size, qr.border
+    width = (qr.modules_count + 2 * border) * box
+    row_bytes = (width + 7) // 8
+    padding = light * (row_bytes * 8 - width)
+    edge = light * (border * box)
+    dark_run, light_run = dark * box, light * box
+
+    quiet = int(light * width + padding, 2).to_bytes(row_bytes, 'big')
+    rows = [quiet] * border
+    for row in qr.modules:
+        bits = edge + ''.join(dark_run if module else light_run for module in row) + edge + padding
+        rows.append(int(bits, 2).to_bytes(row_bytes, 'big'))
+    rows.extend([quiet] * border)
+    return rows, width
+
+
+def png_chunk(tag, data):
+    """Returns a PNG chunk: length, tag, data and CRC."""
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+
+def render_png(qr):
+    """Renders the QR code as a 1-bit grayscale PNG (bit 0 is black)."""
+    rows, width = pixel_rows(qr, '0', '1')
+    # Filter type 0 per scanline; each module row repeats box_size times
+    scanlines = b''.join((b'\x00' + row) * qr.box_size for row in rows)
+    header = struct.pack('>IIBBBBB', width, width, 1, 0, 0, 0, 0)
+    return (PNG_SIGNATURE + png_chunk(b'IHDR', header)
+            + png_chunk(b'IDAT', zlib.compress(scanlines, 6)) + png_chunk(b'IEND', b''))
+
+
+def render_pbm(qr):
+    """Renders the QR code as a binary PBM (P4, bit 1 is black)."""
+    rows, width = pixel_rows(qr, '1', '0')
+    return f"P4\n{width} {width}\n".encode('ascii') + b''.join(row * qr.box_size for row in rows)
+
+
+def render_svg(qr):
+    """Renders the QR code as an SVG path with one rectangle per horizontal run of dark modules."""
+    count, border = qr.modules_count, qr.border
+    size = count + 2 * border
+    runs = []
+    for y, row in enumerate(qr.modules):
+        x = 0
+        while x < count:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < count and row[x]:
+                x += 1
+            runs.append(f"M{start + border},{y + border}h{x - start}v1h-{x - start}z")
+    pixels = size * qr.box_size
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+            f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path d="{"".join(runs)}" fill="#000"/></svg>\n').encode('utf-8')
+
+
+RENDERERS = {'png': render_png, 'svg': render_svg, 'pbm': render_pbm}
+
+
+def write_image(data, output_image):
+    """Writes rendered image bytes to output_image ('-' for stdout)."""
+    if output_image == '-':
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output_image, 'wb') as file:
+            file.write(data)
+
+
+def save_qr(qr, output_image, fmt=None):
+    """Writes a made QR code to output_image ('-' for stdout) straight from its module matrix."""
+    write_image(RENDERERS[output_format(output_image, fmt)](qr), output_image)
+
+
+class SymbolCache:
+    """Rendered QR images keyed by payload and rendering parameters, so repeated payloads skip encoding.
+
+    An in-memory LRU bounded to max_bytes sits in front of an optional
+    directory of image files, which is shared between runs and processes and
+    never pruned. The version is not part of the key: it follows from the
+    payload and error correction level, which are.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_SIZE, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data, fmt, mask):
+        """Returns the cache key for data rendered as fmt with mask (None for the best mask)."""
+        digest = hashlib.sha256(f"{SYMBOL_CACHE_FORMAT}:{ERROR_CORRECTION}:{BOX_SIZE}:{BORDER}:{fmt}:{mask}:".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key, fmt):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{fmt}")
+
+    def _remember(self, key, image):
+        """Adds an image to the in-memory tier, evicting the least recently used entries over budget."""
+        if len(image) > self.max_bytes:
+            return
+        self.entries[key] = image
+        self.size += len(image)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def get(self, data, fmt, mask=None):
+        """Returns the cached image bytes for data, or None."""
+        key = self.key(data, fmt, mask)
+        image = self.entries.get(key)
+        if image is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return image
+        if self.cache_dir:
+            try:
+                with open(self._path(key, fmt), 'rb') as file:
+                    image = file.read()
+            except OSError:
+                pass
+            else:
+                self._remember(key, image)
+                self.hits += 1
+                self.disk_hits += 1
+                return image
+        self.misses += 1
+        return None
+
+    def put(self, data, fmt, mask, image):
+        """Stores the image rendered for data in memory and, with a cache directory, on disk."""
+        key = self.key(data, fmt, mask)
+        if key in self.entries:
+            return
+        self._remember(key, image)
+        if self.cache_dir:
+            path = self._path(key, fmt)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so concurrent runs never read a partial image
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, 'wb') as file:
+                file.write(image)
+            os.replace(partial, path)
+
+    def report(self):
+        """Returns a one-line summary of hits and misses."""
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        return (f"Symbol cache: {self.hits} hits" + (f" ({self.disk_hits} from disk)" if self.cache_dir else "")
+                + f", {self.misses} misses, {rate:.1f}% hit rate.")
+
+
+SEGMENT_MODES = (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE)
+# Bits per character in sixths: 10 per 3 digits, 11 per 2 alphanumerics, 8 per byte
+CHAR_COSTS = (20, 33, 48)
+# Modes each byte value can be encoded in, indexed like SEGMENT_MODES
+BYTE_MODES = tuple((byte in b'0123456789', byte in util.ALPHA_NUM, True) for byte in range(256))
+# Versions sharing the same character count field sizes; within a class every
+# segment that fits also fits its count field
+VERSION_CLASSES = ((1, 9), (10, 26), (27, 40))
+UNREACHABLE = 1 << 62
+
+
+def optimal_segments(data, version):
+    """Returns the (mode, start, end) segments encoding data in the fewest bits at version, and the bit count.
+
+    Dynamic programming over the three modes: costs[m] is the cheapest encoding
+    of the data so far ending in an open segment of mode m, kept in sixths of a
+    bit so digits and alphanumerics stay exact. Closing a segment rounds up to
+    whole bits and opening one pays its mode indicator and count field.
+    """
+    heads = [(4 + util.length_in_bits(mode, version)) * 6 for mode in SEGMENT_MODES]
+    costs = heads[:]
+    parents = []
+    # A memoryview yields ints for bytes and memory maps alike (iterating an mmap yields 1-byte bytes)
+    for byte in memoryview(data):
+        allowed = BYTE_MODES[byte]
+        closed = [-(-cost // 6) * 6 for cost in costs]
+        step, links = [], []
+        for mode in range(3):
+            if not allowed[mode]:
+                step.append(UNREACHABLE)
+                links.append(mode)
+                continue
+            best, parent = costs[mode], mode
+            for previous in range(3):
+                if previous != mode and closed[previous] + heads[mode] < best:
+                    best, parent = closed[previous] + heads[mode], previous
+            step.append(best + CHAR_COSTS[mode])
+            links.append(parent)
+        costs = step
+        parents.append(links)
+
+    closed = [-(-cost // 6) for cost in costs]
+    mode = closed.index(min(closed))
+    segments, end = [], len(data)
+    for index in range(len(data) - 1, -1, -1):
+        previous = parents[index][mode]
+        if previous != mode:
+            segments.append((SEGMENT_MODES[mode], index, end))
+            end = index
+        mode = previous
+    if end:
+        segments.append((SEGMENT_MODES[mode], 0, end))
+    return segments[::-1], min(closed) if data else 0
+
+
+def plan_segments(data, error_correction=ERROR_CORRECTION):
+    """Returns the smallest version for data and its optimal QRData segments.
+
+    Each version class has its own count field sizes, so the segmentation is
+    solved per class, smallest class first, until one fits.
+    """
+    limits = util.BIT_LIMIT_TABLE[error_correction]
+    for first, last in VERSION_CLASSES:
+        # Even an all-digit payload needs 10/3 bits per byte
+        if len(data) * 10 // 3 > limits[last]:
+            continue
+        segments, bits = optimal_segments(data, first)
+        version = bisect_left(limits, bits, first)
+        if version <= last:
+            # Segments are views of data; qrcode parses numeric ones with int(), which needs bytes
+            view = memoryview(data)
+            return version, [util.QRData(bytes(view[start:end]) if mode == util.MODE_NUMBER else view[start:end],
+                                         mode=mode, check_data=False)
+                             for mode, start, end in segments]
+    raise qrcode.exceptions.DataOverflowError(
+        f"{len(data)} bytes exceed the capacity of a Version 40 QR code")
+
+
+def payload_bits(data):
+    """Returns the data bits of data's optimal segments at the largest versions, or UNREACHABLE if it cannot fit."""
+    if len(data) * 10 // 3 > util.BIT_LIMIT_TABLE[ERROR_CORRECTION][40]:
+        return UNREACHABLE
+    return optimal_segments(data, VERSION_CLASSES[-1][0])[1]
+
+
+def compressors():
+    """Returns {codec: compress function} for the codecs available in this environment."""
+    codecs = {
+        'zlib': lambda data: zlib.compress(data, 9),
+        # The legacy .lzma container has a 13-byte header instead of the 60-odd bytes of .xz
+        'lzma': lambda data: lzma.compress(data, format=lzma.FORMAT_ALONE, preset=9 | lzma.PRESET_EXTREME),
+    }
+    if zstandard is not None:
+        codecs['zstd'] = zstandard.ZstdCompressor(level=19).compress
+    return codecs
+
+
+def compress_payload(data, codec='auto'):
+    """Returns (codec, payload) for data compressed with codec.
+
+    'auto' tries every available codec and keeps whichever payload, the
+    uncompressed data included (codec None), needs the fewest QR data bits.
+    """
+    available = compressors()
+    if codec != 'auto' and codec not in available:
+        raise ValueError(f"The {codec} codec is not available; install the zstandard package for zstd.")
+    candidates = {None: data} if codec == 'auto' else {}
+    for name, compress in available.items():
+        if codec in ('auto', name):
+            candidates[name] = compress(data)
+    return min(candidates.items(), key=lambda item: payload_bits(item[1]))
+
+
+# GF(256) with the QR field polynomial x^8 + x^4 + x^3 + x^2 + 1
+GF_POLYNOMIAL = 0x11D
+# Pad codewords alternated after the terminator
+PAD_CODEWORDS = (0xEC, 0x11)
+
+
+def build_gf_tables():
+    """Returns the antilog table (doubled, so products need no modulo) and the log table of GF(256)."""
+    exp, log = [0] * 512, [0] * 256
+    value = 1
+    for power in range(255):
+        exp[power] = exp[power + 255] = value
+        log[value] = power
+        value <<= 1
+        if value & 0x100:
+            value ^= GF_POLYNOMIAL
+    return exp, log
+
+
+GF_EXP, GF_LOG = build_gf_tables()
+# Per error correction codeword count: the 256 generator polynomial multiples, as ints
+RS_FEEDBACK = {}
+
+
+def rs_feedback(ec_count):
+    """Returns the LFSR feedback table for ec_count codewords: entry f is f times the generator, as an int.
+
+    The generator is the product of (x - a^i) for i < ec_count; its leading 1
+    is dropped, leaving ec_count coefficients packed big-endian into one int.
+    """
+    if ec_count not in RS_FEEDBACK:
+        generator = [1]
+        for i in range(ec_count):
+            # Multiply by (x + a^i): shift, then add a^i times the old coefficients
+            generator = [high ^ (GF_EXP[GF_LOG[low] + i] if low else 0)
+                         for high, low in zip(generator + [0], [0] + generator)]
+        logs = [GF_LOG[coefficient] for coefficient in generator[1:]]
+        RS_FEEDBACK[ec_count] = [0] + [int.from_bytes(bytes(GF_EXP[GF_LOG[f] + log] for log in logs), 'big')
+                                       for f in range(1, 256)]
+    return RS_FEEDBACK[ec_count]
+
+
+def rs_remainder(block, ec_count):
+    """Returns the ec_count Reed-Solomon codewords of a data block.
+
+    The remainder register is one int: each data byte shifts it left a byte
+    and XORs in a precomputed generator multiple, a table lookup instead of
+    qrcode's per-coefficient polynomial division.
+    """
+    feedback = rs_feedback(ec_count)
+    shift = 8 * (ec_count - 1)
+    keep = (1 << shift) - 1
+    remainder = 0
+    for byte in block:
+        remainder = ((remainder & keep) << 8) ^ feedback[(remainder >> shift) ^ byte]
+    return remainder.to_bytes(ec_count, 'big')
+
+
+def interleave(blocks):
+    """Returns the codewords of blocks interleaved column by column, as a symbol stores them."""
+    shortest = min(len(block) for block in blocks)
+    # Blocks differ by at most one codeword; the longer ones' last codewords come after the rest
+    return bytes(chain.from_iterable(zip(*blocks))) + bytes(block[shortest] for block in blocks
+                                                            if len(block) > shortest)
 
+
+def data_codewords(version, error_correction, segments):
+    """Returns the data codewords of segments: mode, count and data bits, terminator and padding.
+
+    Bits accumulate in one int; byte segments are appended whole with
+    int.from_bytes rather than a bit at a time.
+    """
+    value, length = 0, 0
+    for segment in segments:
+        count_bits = util.length_in_bits(segment.mode, version)
+        value = (value << 4 + count_bits) | (segment.mode << count_bits) | len(segment)
+        length += 4 + count_bits
+        if segment.mode == util.MODE_8BIT_BYTE:
+            bits, size = int.from_bytes(segment.data, 'big'), 8 * len(segment.data)
+        else:
+            buffer = util.BitBuffer()
+            segment.write(buffer)
+            size = len(buffer)
+            bits = int.from_bytes(bytes(buffer.buffer), 'big') >> (8 * len(buffer.buffer) - size)
+        value = (value << size) | bits
+        length += size
+
+    capacity = sum(block.data_count for block in base.rs_blocks(version, error_correction))
+    if length > 8 * capacity:
+        raise qrcode.exceptions.DataOverflowError(
+            f"Code length overflow. Data size ({length}) > size available ({8 * capacity})")
+    # Up to four terminator bits, then zeros to the next byte boundary
+    padding = min(8 * capacity - length, 4)
+    padding += -(length + padding) % 8
+    data = (value << padding).to_bytes((length + padding) // 8, 'big')
+    fill = capacity - len(data)
+    return data + bytes(PAD_CODEWORDS) * (fill // 2) + bytes(PAD_CODEWORDS[:fill % 2])
+
+
+def create_codewords(version, error_correction, segments):
+    """Returns the interleaved data and error correction codewords for segments, as util.create_data does."""
+    data = data_codewords(version, error_correction, segments)
+    data_blocks, ec_blocks = [], []
+    offset = 0
+    for block in base.rs_blocks(version, error_correction):
+        data_blocks.append(data[offset:offset + block.data_count])
+        ec_blocks.append(rs_remainder(data_blocks[-1], block.total_count - block.data_count))
+        offset += block.data_count
+    return interleave(data_blocks) + interleave(ec_blocks)
+
+
+# Finder-like 1:1:3:1:1 runs with four light modules on one side; neither overlaps itself
+FINDER_PATTERNS = ('10111010000', '00001011101')
+LONG_RUN = re.compile(r'0{5,}|1{5,}')
+MODULE_BITS = bytes.maketrans(b'\x00\x01', b'01')
+MASK_PERIOD = 12  # Every mask function repeats with this period in both rows and columns
+
+# Per version: row bitmasks of the modules map_data fills, and of each mask pattern over them
+DATA_REGIONS = {}
+MASK_ROWS = {}
+
+
+def row_penalty(rows):
+    """Returns the lost_point penalty score for a matrix given as '0'/'1' row strings.
+
+    Runs and finder-like patterns are found with regex and str.count on each
+    row and column, and 2x2 blocks with bitwise operations on adjacent rows.
+    """
+    count = len(rows)
+    penalty = 0
+    for line in rows + [''.join(column) for column in zip(*rows)]:
+        penalty += sum(len(run) - 2 for run in LONG_RUN.findall(line))
+        penalty += 40 * (line.count(FINDER_PATTERNS[0]) + line.count(FINDER_PATTERNS[1]))
+
+    full = (1 << count) - 1
+    values = [int(row, 2) for row in rows]
+    for upper, lower in zip(values, values[1:]):
+        same = ~(upper ^ lower) & full
+        blocks = same & (same >> 1) & ~(upper ^ (upper >> 1)) & (full >> 1)
+        penalty += 3 * bin(blocks).count('1')
+
+    percent = float(sum(row.count('1') for row in rows)) / (count ** 2)
+    return penalty + int(abs(percent * 100 - 50) / 5) * 10
+
+
+def mask_rows(version, pattern):
+    """Returns the row bitmasks of the data modules that mask pattern inverts in a version."""
+    key = version, pattern
+    if key not in MASK_ROWS:
+        count = version * 4 + 17
+        mask = util.mask_func(pattern)
+        tiles = [''.join('1' if mask(row, col) else '0' for col in range(MASK_PERIOD))
+                 for row in range(MASK_PERIOD)]
+        repeat = count // MASK_PERIOD + 1
+        MASK_ROWS[key] = [int((tiles[row % MASK_PERIOD] * repeat)[:count], 2) & region
+                          for row, region in enumerate(DATA_REGIONS[version])]
+    return MASK_ROWS[key]
+
+
+class FastQRCode(qrcode.QRCode):
+    """QRCode that places the data once and derives the eight mask candidates with XOR.
+
+    map_data inverts exactly the data modules a mask selects, so a candidate is
+    the placed matrix XOR the difference of two mask bitmasks. Candidates are
+    scored with row_penalty, which matches qrcode.util.lost_point. Codewords
+    come from create_codewords instead of util.create_data.
+    """
+
+    def makeImpl(self, test, mask_pattern):
+        if self.data_cache is None:
+            self.data_cache = create_codewords(self.version, self.error_correction, self.data_list)
+        super().makeImpl(test, mask_pattern)
+
+    def map_data(self, data, mask_pattern):
+        if self.version not in DATA_REGIONS:
+            DATA_REGIONS[self.version] = [int(''.join('0' if module is not None else '1' for module in row), 2)
+                                          for row in self.modules]
+        super().map_data(data, mask_pattern)
+
+    def best_mask_pattern(self):
+        self.makeImpl(True, 0)
+        count = self.modules_count
+        placed = [int(bytes(row).translate(MODULE_BITS), 2) for row in self.modules]
+        unmasked = [row ^ mask for row, mask in zip(placed, mask_rows(self.version, 0))]
+        scores = []
+        for pattern in MASK_PATTERNS:
+            masked = zip(unmasked, mask_rows(self.version, pattern))
+            scores.append(row_penalty([format(row ^ mask, f'0{count}b') for row, mask in masked]))
+        return scores.index(min(scores))
+
+
+def build_qr(data, mask=None):
+    """Builds the smallest level L QR code for data.
+
+    Data is split into optimal numeric/alphanumeric/byte segments, which decode
+    back to the same bytes, and the version comes from the segment bit count,
+    so qrcode's own fit search is skipped; a fixed mask (0-7) skips the mask
+    search as well.
+    """
+    version, segments = plan_segments(data)
+    qr = FastQRCode(
+        version=version,
+        error_correction=ERROR_CORRECTION,
+        box_size=BOX_SIZE,
+        border=BORDER,
+        mask_pattern=mask,
+    )
+    for segment in segments:
+        qr.add_data(segment)
+    qr.make(fit=False)
+    return qr
+
+
+def make_qr_image(data, output_image, fmt=None, mask=None, cache=None):
+    """Builds the smallest level L QR code for data and saves it to output_image ('-' for stdout).
+
+    With a SymbolCache, a payload rendered before is written from the cache.
+    """
+    fmt = output_format(output_image, fmt)
+    image = cache.get(data, fmt, mask) if cache else None
+    if image is None:
+        image = RENDERERS[fmt](build_qr(data, mask))
+        if cache:
+            cache.put(data, fmt, mask, image)
+    write_image(image, output_image)
+
+
+def encode_to_qr(input_file, output_image, fmt=None, mask=None, compress=None, cache=None):
+    """Encodes the contents of the input file into a QR code image behind a file header.
+
+    With compress ('auto', 'zlib', 'lzma' or 'zstd') the content is compressed
+    first and the codec recorded in the header. A SymbolCache reuses the image
+    of an identical earlier payload.
+    """
+    out = status_stream(output_image)
+    if input_file != '-' and not os.path.exists(input_file):
+        print(f"Error: The file '{input_file}' does not exist.", file=out)
+        return
+
+    capacity_error = (f"Error: The file exceeds the maximum QR code capacity ({MAX_BINARY_SIZE} bytes of binary "
+                      f"data). Use the 'chunked' command to split it across several QR codes.")
     try:
-        with open(input_file, 'rb') as file:
-            file_content = file.read()
+        with open_input(input_file) as file_content:
+            # Too large to fit even as digits: stop before any of the file is read
+            if not compress and len(file_content) > MAX_QR_CHARACTERS:
+                print(capacity_error, file=out)
+                return
 
-        # Get file extension
-        file_extension = os.path.splitext(input_file)[1]
-        metadata = f"EXT:{file_extension}\n".encode('utf-8')
+            body, codec = file_content, None
+            if compress:
+                codec, body = compress_payload(file_content, compress)
+                if codec:
+                    print(f"Compressed with {codec}: {len(file_content)} -> {len(body)} bytes.", file=out)
+                else:
+                    print("Compression would not make the QR code smaller; storing the data as is.", file=out)
 
-        # Combine metadata and file content
-        data_to_encode = metadata + file_content
+            # Combine the header and file content
+            header = build_header(input_file, len(file_content), hashlib.sha256(file_content).digest(), codec)
+            data_to_encode = header + body
 
-        # Check if the combined data size exceeds QR code capacity
-        max_binary_size = 2953  # Max bytes for Version 40, Error Correction Level L
-        if len(data_to_encode) > max_binary_size:
-            print(f"Error: The file size exceeds the maximum QR code capacity of {max_binary_size} bytes.")
+        # Digits and alphanumerics pack tighter than bytes, so capacity depends on the content
+        try:
+            make_qr_image(data_to_encode, output_image, fmt, mask, cache)
+        except qrcode.exceptions.DataOverflowError:
+            print(capacity_error, file=out)
             return
+        destination = "stdout" if output_image == '-' else f"'{output_image}'"
+        print(f"QR code successfully generated and saved as {destination}.", file=out)
+
+    except Exception as e:
+        print(f"Error: {e}", file=out)
+
+
+def file_digest(input_file):
+    """Returns the truncated SHA-256 digest of a file, hashed straight from its memory map."""
+    with open_input(input_file) as content:
+        return hashlib.sha256(content).digest()[:16]
+
+
+def chunk_payload(content, file_header, index):
+    """Returns chunk index's CHUNK_PAYLOAD_SIZE window of file header + content, copying only that window."""
+    start = index * CHUNK_PAYLOAD_SIZE - len(file_header)
+    if start < 0:
+        return file_header + content[:start + CHUNK_PAYLOAD_SIZE]
+    return content[start:start + CHUNK_PAYLOAD_SIZE]
+
+
+def chunk_image_path(output_image, index, fmt=None):
+    """Returns the image path for the chunk at the given sequence index."""
+    stem, ext = os.path.splitext(output_image)
+    return f"{stem}_{index:04d}{ext or '.' + (fmt or 'png')}"
+
 
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=40,  # Maximum QR code version
-            error_correction=qrcode.constants.ERROR_CORRECT_L,  # Low error correction for maximum data
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data_to_encode)
-        qr.make(fit=True)
-
-        # Create and save the QR code image
-        img = qr.make_image(fill_color="black", back_color="white")
-        img.save(output_image)
-        print(f"QR code successfully generated and saved as '{output_image}'.")
+def _encode_chunk(input_file, file_header, index, total, digest, output_image, fmt, mask):
+    """Process pool worker: maps the input and renders the chunk at index."""
+    with open_input(input_file) as content:
+        payload = chunk_payload(content, file_header, index)
+    header = CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_VERSION, index, total, digest)
+    make_qr_image(header + payload, output_image, fmt, mask)
+    return output_image
+
+
+def encode_chunked(input_file, output_image, jobs=None, fmt=None, mask=None):
+    """Splits a file of any size across a numbered sequence of QR code images."""
+    if input_file == '-' or output_image == '-':
+        print("Error: Chunked encoding needs a named input file and output image path.")
+        return []
+    if not os.path.exists(input_file):
+        print(f"Error: The file '{input_file}' does not exist.")
+        return []
+
+    try:
+        size = os.path.getsize(input_file)
+        # The header length does not depend on the chunk count it records
+        header_size = len(build_header(input_file, size, bytes(16)))
+        total = -(-(header_size + size) // CHUNK_PAYLOAD_SIZE)
+        if total > 0xFFFF:
+            print(f"Error: The file needs {total} QR codes, more than the supported maximum of {0xFFFF}.")
+            return []
+        digest = file_digest(input_file)
+        file_header = build_header(input_file, size, digest, chunks=total)
+
+        jobs = jobs or os.cpu_count() or 1
+        written = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # Workers map the file and slice their own chunk, so nothing but the
+            # chunk index crosses the process boundary; in-flight tasks stay bounded
+            in_flight = set()
+            for index in range(total):
+                in_flight.add(executor.submit(_encode_chunk, input_file, file_header, index, total, digest,
+                                              chunk_image_path(output_image, index, fmt), fmt, mask))
+                if len(in_flight) >= jobs * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    written.extend(future.result() for future in done)
+            written.extend(future.result() for future in in_flight)
+
+        print(f"{total} QR codes successfully generated as '{chunk_image_path(output_image, 0, fmt)}' "
+              f"... '{chunk_image_path(output_image, total - 1, fmt)}'.")
+        return sorted(written)
 
     except Exception as e:
         print(f"Error: {e}")
+        return []
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python3 qr_tool.py encode <input_file> <output_image>")
+
+def image_name(name, index):
+    """Returns a safe file name stem for a manifest row, numbering rows without a usable name."""
+    name = UNSAFE_NAME_CHARS.sub('_', str(name or '')).strip('.')
+    return name or f"{index:06d}"
+
+
+def read_manifest(manifest, manifest_format=None):
+    """Yields (name, data) for each row of a CSV or JSONL manifest ('-' for stdin), reading it lazily.
+
+    CSV needs a header row with a 'data' column; JSONL lines are objects with
+    a 'data' field (non-string values are encoded as compact JSON) or bare
+    strings. An optional 'name' column or field names the image.
+    """
+    manifest_format = manifest_format or MANIFEST_FORMATS.get(os.path.splitext(manifest)[1].lower())
+    if manifest_format is None:
+        raise ValueError(f"Cannot tell the format of manifest '{manifest}'; use --manifest-format.")
+    with (open(sys.stdin.fileno(), 'r', encoding='utf-8', newline='', closefd=False) if manifest == '-'
+          else open(manifest, 'r', encoding='utf-8', newline='')) as file:
+        if manifest_format == 'csv':
+            reader = csv.DictReader(file)
+            if 'data' not in (reader.fieldnames or ()):
+                raise ValueError(f"Manifest '{manifest}' needs a header row with a 'data' column.")
+            for index, row in enumerate(reader):
+                yield image_name(row.get('name'), index), (row['data'] or '').encode('utf-8')
+            return
+
+        index = 0
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Manifest '{manifest}' line {line_number}: {e}")
+            if not isinstance(row, dict):
+                row = {'data': row}
+            if 'data' not in row:
+                raise ValueError(f"Manifest '{manifest}' line {line_number} has no 'data' field.")
+            data = row['data']
+            if not isinstance(data, str):
+                data = json.dumps(data, separators=(',', ':'))
+            yield image_name(row.get('name'), index), data.encode('utf-8')
+            index += 1
+
+
+@contextmanager
+def batch_writer(output, fmt):
+    """Yields write(filename, data), storing images in a directory, a zip or tar archive, or a tar stream on stdout.
+
+    One archive avoids the file system cost of many small files; PNGs are
+    already compressed, so zip stores them as they are.
+    """
+    lowered = output.lower()
+    tar_mode = next((mode for suffix, mode in TAR_MODES.items() if lowered.endswith(suffix)), None)
+    if output == '-' or tar_mode:
+        with (tarfile.open(fileobj=sys.stdout.buffer, mode='w|') if output == '-'
+              else tarfile.open(output, tar_mode)) as archive:
+            def write(filename, data):
+                info = tarfile.TarInfo(filename)
+                info.size, info.mtime, info.mode = len(data), time.time(), 0o644
+                archive.addfile(info, io.BytesIO(data))
+
+            yield write
+    elif lowered.endswith('.zip'):
+        compression = zipfile.ZIP_STORED if fmt == 'png' else zipfile.ZIP_DEFLATED
+        with zipfile.ZipFile(output, 'w', compression) as archive:
+            yield archive.writestr
     else:
-        command = sys.argv[1].lower()
-        if command == "encode" and len(sys.argv) == 4:
-            input_file = sys.argv[2]
-            output_image = sys.argv[3]
-            encode_to_qr(input_file, output_image)
-        else:
-            print("Usage: python3 qr_tool.py encode <input_file> <output_image>")
+        os.makedirs(output, exist_ok=True)
+
+        def write(filename, data):
+            with open(os.path.join(output, filename), 'wb') as file:
+                file.write(data)
+
+        yield write
+
+
+def _render_batch(rows, fmt, mask):
+    """Process pool worker: renders manifest rows, returning (name, image bytes or None, error) for each."""
+    rendered = []
+    for name, data in rows:
+        try:
+            rendered.append((name, RENDERERS[fmt](build_qr(data, mask)), None))
+        except qrcode.exceptions.DataOverflowError:
+            rendered.append((name, None, f"{len(data)} bytes exceed the capacity of one QR code"))
+        except Exception as e:
+            rendered.append((name, None, str(e)))
+    return rendered
+
+
+def encode_batch(manifest, output, jobs=None, fmt=None, mask=None, manifest_format=None, cache=None):
+    """Encodes each row of a CSV or JSONL manifest into its own QR code image.
+
+    Rows are read lazily and rendered BATCH_SIZE at a time across a process
+    pool, with a bounded number of batches in flight. This process writes the
+    images in manifest order, so progress reports and archive order follow it.
+    Rows whose payload is in the SymbolCache are written from it without
+    reaching a worker, and each distinct payload still in flight is rendered
+    once for all the rows that repeat it. Returns the number of images written.
+    """
+    out = status_stream(output)
+    if manifest != '-' and not os.path.exists(manifest):
+        print(f"Error: The manifest '{manifest}' does not exist.", file=out)
+        return 0
+    if manifest == '-' and output == '-':
+        print("Error: The manifest and the output cannot both use stdin/stdout.", file=out)
+        return 0
+
+    fmt = fmt or 'png'
+    jobs = jobs or os.cpu_count() or 1
+    written = failed = 0
+    names = set()
+    try:
+        rows = read_manifest(manifest, manifest_format)
+        with batch_writer(output, fmt) as write, ProcessPoolExecutor(max_workers=jobs) as executor:
+            # Payloads being rendered, by cache key: (future, index of the payload in its work list)
+            pending = {}
+
+            def store(batch, keys, sources):
+                nonlocal written, failed
+                for (name, data), key, source in zip(batch, keys, sources):
+                    error = None
+                    image = source
+                    if isinstance(source, tuple):
+                        future, index = source
+                        _, image, error = future.result()[index]
+                        # The first row of a render caches it; rows after it find it there
+                        if pending.get(key) is source:
+                            del pending[key]
+                            if error is None and cache:
+                                cache.put(data, fmt, mask, image)
+                    filename = f"{name}.{fmt}"
+                    if error is None and filename in names:
+                        error = "duplicate name"
+                    if error is not None:
+                        print(f"Error: row '{name}': {error}; skipped.", file=out)
+                        failed += 1
+                        continue
+                    names.add(filename)
+                    write(filename, image)
+                    written += 1
+                    if (written + failed) % PROGRESS_INTERVAL == 0:
+                        print(f"{written + failed} rows processed...", file=out)
+
+            # Results are collected oldest first, so output order matches the manifest
+            in_flight = deque()
+            while batch := list(islice(rows, BATCH_SIZE)):
+                keys = [SymbolCache.key(data, fmt, mask) for _, data in batch]
+                images, misses = {}, {}
+                for row, key in zip(batch, keys):
+                    if key in images or key in misses or key in pending:
+                        # Repeats of a payload already looked up share its image or render
+                        if cache:
+                            cache.hits += 1
+                        continue
+                    image = cache.get(row[1], fmt, mask) if cache else None
+                    if image is not None:
+                        images[key] = image
+                    else:
+                        misses[key] = row
+                if misses:
+                    future = executor.submit(_render_batch, list(misses.values()), fmt, mask)
+                    for index, key in enumerate(misses):
+                        pending[key] = (future, index)
+                sources = [images[key] if key in images else pending[key] for key in keys]
+                in_flight.append((batch, keys, sources))
+                if len(in_flight) >= jobs * 2:
+                    store(*in_flight.popleft())
+            while in_flight:
+                store(*in_flight.popleft())
+
+        print(f"{written} QR codes written to " + ("stdout" if output == '-' else f"'{output}'")
+              + (f"; {failed} rows failed." if failed else "."), file=out)
+        if cache:
+            print(cache.report(), file=out)
+        return written
+
+    except Exception as e:
+        print(f"Error: {e}", file=out)
+        return written
+
+
+def parse_arguments():
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Encode a file into QR code images.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    encode = commands.add_parser("encode", help="Encode a file into a single QR code.")
+    encode.add_argument("input_file", help="Path to the input file, or '-' for stdin.")
+    encode.add_argument("output_image", help="Path to save the QR code image, or '-' for PNG on stdout.")
+    encode.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default=None,
+                        help="Output format (default: from the file extension, PNG for stdout).")
+    encode.add_argument("-m", "--mask", type=int, choices=MASK_PATTERNS, default=None,
+                        help="Fixed mask pattern 0-7, skipping the mask search (default: lowest penalty).")
+    encode.add_argument("-c", "--compress", choices=('auto',) + tuple(COMPRESSION_CODECS), default=None,
+                        help="Compress the data first; 'auto' keeps the codec giving the smallest QR code.")
+    encode.add_argument("--cache-dir", default=None,
+                        help="Reuse the image of an identical earlier payload from this directory.")
+
+    chunked = commands.add_parser("chunked", help="Encode a file of any size into a sequence of QR codes.")
+    chunked.add_argument("input_file", help="Path to the input file.")
+    chunked.add_argument("output_image", help="Base path for the images, numbered as <name>_0000.png, ...")
+    chunked.add_argument("-j", "--jobs", type=int, default=None,
+                         help="Worker processes used to render the QR codes (default: CPU count).")
+    chunked.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default=None,
+                         help="Output format (default: from the file extension, else PNG).")
+    chunked.add_argument("-m", "--mask", type=int, choices=MASK_PATTERNS, default=None,
+                         help="Fixed mask pattern 0-7, skipping the mask search (default: lowest penalty).")
+
+    batch = commands.add_parser("batch", help="Encode each row of a CSV or JSONL manifest into its own QR code.")
+    batch.add_argument("manifest", help="CSV with a 'data' column (and optional 'name'), or JSONL objects "
+                                        "with a 'data' field; '-' reads stdin.")
+    batch.add_argument("output", help="Output directory, a .zip/.tar/.tar.gz archive, or '-' for a tar stream "
+                                      "on stdout.")
+    batch.add_argument("--manifest-format", choices=sorted(set(MANIFEST_FORMATS.values())), default=None,
+                       help="Manifest format (default: from the manifest extension).")
+    batch.add_argument("-j", "--jobs", type=int, default=None,
+                       help="Worker processes used to render the QR codes (default: CPU count).")
+    batch.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default=None,
+                       help="Image format (default: png).")
+    batch.add_argument("-m", "--mask", type=int, choices=MASK_PATTERNS, default=None,
+                       help="Fixed mask pattern 0-7, skipping the mask search (default: lowest penalty).")
+    batch.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                       help="Memory for images of repeated payloads, in MB (default: %(default)s).")
+    batch.add_argument("--cache-dir", default=None,
+                       help="Also keep rendered images in this directory, shared between runs (never pruned).")
+    batch.add_argument("--no-cache", action="store_true", help="Render every row, even repeated payloads.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.command == "encode":
+        # A single run only benefits from the disk tier
+        cache = SymbolCache(0, args.cache_dir) if args.cache_dir else None
+        encode_to_qr(args.input_file, args.output_image, args.format, args.mask, args.compress, cache)
+    elif args.command == "chunked":
+        encode_chunked(args.input_file, args.output_image, args.jobs, args.format, args.mask)
+    elif args.command == "batch":
+        cache = None if args.no_cache else SymbolCache(args.cache_size * 1024 * 1024, args.cache_dir)
+        encode_batch(args.manifest, args.output, args.jobs, args.format, args.mask, args.manifest_format, cache)
@@ -0,0 +1,88 @@
+"""
+Fixtures shared by the tests: the decoder modules, imported from their files
+under distinct names, and a fake scanner standing in for libzbar so the tests
+run without it. encode.py is importable as `encode`, as in the benchmarks.
+"""
+
+import os
+import sys
+import time
+import threading
+import importlib.util
+from collections import namedtuple
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TREE = os.path.join(HERE, '..', '..')
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+Rect = namedtuple('Rect', 'left top width height')
+Symbol = namedtuple('Symbol', 'data rect polygon')
+
+
+def load_decoder(author):
+    """Imports <author>/decoder/decoder.py once, as <author>_decoder."""
+    name = f"{author.lower()}_decoder"
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(TREE, author, 'decoder', 'decoder.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+class FakeScanner:
+    """Replaces QRDecoder._scan: the payload is the image name itself, and 'missing' holds no QR code.
+
+    Scans wait while `gate` is cleared, then take `delay` seconds, or the
+    image's entry in `delays`; the images scanned and the most scans seen
+    running at once are recorded.
+    """
+
+    def __init__(self, module, delay=0.01):
+        self.module = module
+        self.delay = delay
+        self.delays = {}
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = []
+        self.running = self.peak = 0
+        self._lock = threading.Lock()
+
+    def scan(self, image):
+        name = image if isinstance(image, bytes) else str(image).encode()
+        with self._lock:
+            self.started.append(name)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            self.gate.wait(10)
+            time.sleep(self.delays.get(name, self.delay))
+        finally:
+            with self._lock:
+                self.running -= 1
+        if name == b'missing':
+            raise self.module.QRCodeNotFoundError("No QR code found in image")
+        symbols = [Symbol(name, Rect(0, 0, 21, 21), [])]
+        # Rndastech's _scan reports the preprocessing stage along with the symbols
+        if hasattr(self.module, 'ScanResult'):
+            return self.module.ScanResult(symbols, self.module.PreprocessStage.GRAYSCALE)
+        return symbols
+
+
+@pytest.fixture(params=['Rndastech', 'Puravi'])
+def decoder_module(request):
+    return load_decoder(request.param)
+
+
+@pytest.fixture
+def scanner(decoder_module, monkeypatch):
+    scanner = FakeScanner(decoder_module)
+    if hasattr(decoder_module, 'ScanResult'):
+        monkeypatch.setattr(decoder_module.QRDecoder, '_scan', lambda self, image: scanner.scan(image))
+    else:
+        monkeypatch.setattr(decoder_module.QRDecoder, '_scan', staticmethod(scanner.scan))
+    yield scanner
+    # Never leave a worker thread blocked behind the gate
+    scanner.gate.set()
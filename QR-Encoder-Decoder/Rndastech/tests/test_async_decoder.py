@@ -0,0 +1,117 @@
+"""AsyncQRDecoder of the Rndastech and Puravi decoders, with libzbar replaced by FakeScanner."""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+
+def names(count):
+    return [f"image-{i}" for i in range(count)]
+
+
+def test_decode(decoder_module, scanner):
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=2) as decoder:
+            return await decoder.decode('image-0')
+
+    content = asyncio.run(main())
+    assert bytes(content.decoded_data) == b'image-0'
+
+
+def test_decode_failure_raises_decoder_error(decoder_module, scanner):
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=2) as decoder:
+            await decoder.decode('missing')
+
+    with pytest.raises(decoder_module.QRDecoderError, match='No QR code found'):
+        asyncio.run(main())
+
+
+def test_decode_many_keeps_input_order(decoder_module, scanner):
+    images = names(8)
+    # Earlier images take longer, so they finish last
+    scanner.delays = {image.encode(): 0.005 * (len(images) - i) for i, image in enumerate(images)}
+
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=4) as decoder:
+            return await decoder.decode_many(images)
+
+    contents = asyncio.run(main())
+    assert [bytes(content.decoded_data) for content in contents] == [image.encode() for image in images]
+
+
+def test_decode_many_return_exceptions(decoder_module, scanner):
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=2) as decoder:
+            return await decoder.decode_many(['image-0', 'missing', 'image-2'], return_exceptions=True)
+
+    first, failure, last = asyncio.run(main())
+    assert bytes(first.decoded_data) == b'image-0'
+    assert isinstance(failure, decoder_module.QRDecoderError)
+    assert bytes(last.decoded_data) == b'image-2'
+
+
+def test_decode_many_first_failure_cancels_the_rest(decoder_module, scanner):
+    images = ['missing', *names(6)]
+
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=1, max_concurrency=1) as decoder:
+            await decoder.decode_many(images)
+
+    with pytest.raises(decoder_module.QRDecoderError):
+        asyncio.run(main())
+    # The image let through as the failing one released its slot may still run; no more
+    assert scanner.started[0] == b'missing'
+    assert len(scanner.started) <= 2
+
+
+def test_cancellation_drops_queued_decodes(decoder_module, scanner):
+    scanner.gate.clear()
+
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=2, max_concurrency=2) as decoder:
+            task = asyncio.ensure_future(decoder.decode_many(names(6)))
+            while len(scanner.started) < 2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # The two running scans finish in the background; nothing else starts
+            scanner.gate.set()
+
+    asyncio.run(main())
+    assert len(scanner.started) == 2
+
+
+def test_max_concurrency_caps_running_decodes(decoder_module, scanner):
+    scanner.delay = 0.05
+
+    async def main():
+        async with decoder_module.AsyncQRDecoder(max_workers=8, max_concurrency=3) as decoder:
+            return await decoder.decode_many(names(12))
+
+    assert len(asyncio.run(main())) == 12
+    assert scanner.peak == 3
+
+
+@pytest.mark.parametrize('decoder_module', ['Rndastech'], indirect=True)
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs the fork start method")
+def test_caller_process_pool_gets_decoder_options_and_cache(decoder_module, tmp_path):
+    # The scan is only in the cache, under these options: a default decoder in the worker would miss it
+    options = decoder_module.PreprocessOptions(max_dimension=321)
+    cache = decoder_module.DecodeCache(tmp_path)
+    image = b'not an image, but its scan is cached'
+    symbol = decoder_module.CachedSymbol(b'cached payload', 'QRCODE', decoder_module.CachedRect(0, 0, 21, 21), [])
+    cache.put(cache.key(image, options), decoder_module.ScanResult([symbol], decoder_module.PreprocessStage.GRAYSCALE))
+
+    async def main(executor):
+        decoder = decoder_module.AsyncQRDecoder(decoder_module.QRDecoder(options, cache), executor=executor)
+        async with decoder:
+            return await decoder.decode(image)
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork')) as executor:
+        content = asyncio.run(main(executor))
+    assert bytes(content.decoded_data) == b'cached payload'
+    assert content.cached
@@ -0,0 +1,43 @@
+"""The Rndastech decoder's DecodeCache: hits are answered without Pillow or pyzbar."""
+
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.parametrize('decoder_module', ['Rndastech'], indirect=True)
+
+
+@pytest.fixture
+def no_scanner(monkeypatch):
+    """Makes importing Pillow or pyzbar fail, as on a machine without them."""
+    for name in ('PIL', 'PIL.Image', 'pyzbar', 'pyzbar.pyzbar'):
+        monkeypatch.setitem(sys.modules, name, None)
+
+
+def scan_result(module, data=b'hello'):
+    symbol = module.CachedSymbol(data, 'QRCODE', module.CachedRect(4, 5, 21, 21),
+                                 [module.CachedPoint(4, 5), module.CachedPoint(4, 26),
+                                  module.CachedPoint(25, 26), module.CachedPoint(25, 5)], 1, 'UP')
+    return module.ScanResult([symbol], module.PreprocessStage.GRAYSCALE)
+
+
+def test_hit_round_trips_the_scan(decoder_module, tmp_path, no_scanner):
+    cache = decoder_module.DecodeCache(tmp_path)
+    result = scan_result(decoder_module)
+    cache.put('key', result)
+
+    assert cache.get('key') == result._replace(cached=True)
+    assert cache.get('other') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_decode_from_cache_needs_no_scanner(decoder_module, tmp_path, no_scanner):
+    cache = decoder_module.DecodeCache(tmp_path)
+    decoder = decoder_module.QRDecoder(cache=cache)
+    image = b'not an image, but its scan is cached'
+    cache.put(cache.key(image, decoder.options), scan_result(decoder_module, b'cached payload'))
+
+    content = decoder.decode(image, decoder_module.DataFormat.BINARY)
+    assert bytes(content.decoded_data) == b'cached payload'
+    assert content.cached
+    assert list(content.rect) == [4, 5, 21, 21]
@@ -0,0 +1,132 @@
+"""The decoder's HTTP server on localhost, decoding in a thread pool with libzbar replaced by FakeScanner."""
+
+import json
+import time
+import base64
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytestmark = pytest.mark.parametrize('decoder_module', ['Rndastech'], indirect=True)
+
+
+@pytest.fixture
+def server(decoder_module, scanner):
+    executor = ThreadPoolExecutor(max_workers=1)
+    server = decoder_module.DecodeServer(('127.0.0.1', 0), workers=1, queue_size=1,
+                                         request_timeout=1.0, executor=executor)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    scanner.gate.set()
+    server.shutdown()
+    server.server_close()
+    executor.shutdown()
+
+
+def request(server, path, body=None):
+    """Returns the status, headers and body of a GET, or a POST when body is given."""
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    try:
+        with urllib.request.urlopen(url, data=body, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def health(server):
+    status, _, body = request(server, '/health')
+    assert status == 200
+    return json.loads(body)
+
+
+def test_decode(server):
+    status, headers, body = request(server, '/decode', b'image-0')
+    assert status == 200
+    assert headers['Content-Type'] == 'application/json'
+    symbols = json.loads(body)['symbols']
+    assert [base64.b64decode(symbol['data']) for symbol in symbols] == [b'image-0']
+    assert symbols[0]['stage'] == 'grayscale'
+
+
+def test_decode_binary(server):
+    status, headers, body = request(server, '/decode?format=binary', b'image-0')
+    assert status == 200
+    assert headers['Content-Type'] == 'application/octet-stream'
+    assert body == b'image-0'
+
+
+def test_no_qr_code_is_422(server):
+    status, _, body = request(server, '/decode', b'missing')
+    assert status == 422
+    assert 'No QR code found' in json.loads(body)['error']
+
+
+def test_empty_body_is_400(server):
+    status, _, _ = request(server, '/decode', b'')
+    assert status == 400
+
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1.5'])
+def test_bad_content_length_is_400(server, scanner, length):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    try:
+        connection.putrequest('POST', '/decode')
+        connection.putheader('Content-Length', length)
+        connection.endheaders(b'image-0')
+        response = connection.getresponse()
+        assert response.status == 400
+        assert json.loads(response.read()) == {'error': 'Invalid Content-Length header'}
+    finally:
+        connection.close()
+    assert scanner.started == []
+    assert health(server)['in_flight'] == 0
+
+
+def test_unknown_path_is_404(server):
+    assert request(server, '/encode', b'image-0')[0] == 404
+    assert request(server, '/')[0] == 404
+
+
+def test_oversized_body_is_413(server, decoder_module, scanner, monkeypatch):
+    monkeypatch.setattr(decoder_module, 'MAX_REQUEST_BYTES', 16)
+    status, _, _ = request(server, '/decode', b'x' * 17)
+    assert status == 413
+    assert scanner.started == []
+
+
+def test_saturated_server_is_503(server, scanner):
+    for _ in range(server.capacity):
+        assert server.acquire_slot()
+    try:
+        status, headers, _ = request(server, '/decode', b'image-0')
+    finally:
+        for _ in range(server.capacity):
+            server.release_slot()
+    assert status == 503
+    assert headers['Retry-After'] == '1'
+    assert scanner.started == []
+
+
+def test_health(server):
+    assert health(server) == {'status': 'ok', 'in_flight': 0, 'capacity': 2}
+    request(server, '/decode', b'image-0')
+    assert health(server)['in_flight'] == 0
+
+
+def test_timeout_is_504_and_keeps_the_slot(server, scanner):
+    scanner.gate.clear()
+    status, _, _ = request(server, '/decode', b'image-0')
+    assert status == 504
+    # The decode is still running, so its slot is still taken
+    assert health(server)['in_flight'] == 1
+
+    scanner.gate.set()
+    deadline = time.monotonic() + 5
+    while health(server)['in_flight'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert health(server)['in_flight'] == 0
@@ -0,0 +1,23 @@
+"""Argument checks of the Rndastech decoder CLI, which run before any image is read."""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+DECODER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'decoder', 'decoder.py')
+
+
+@pytest.mark.parametrize('args', [
+    ['-i', 'qr.png', '-o', '-', '-r'],
+    ['--batch', 'images', '-o', '-', '-r'],
+    ['-i', 'qr.png', '-o', '-', '-a'],
+    ['--batch', 'images', '-o', '-'],
+], ids=['reassemble', 'batch-reassemble', 'all', 'batch'])
+def test_stdout_output_takes_one_payload(tmp_path, args):
+    result = subprocess.run([sys.executable, DECODER, *args], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert '-o - (stdout)' in result.stderr
+    assert result.stdout == ''
+    assert os.listdir(tmp_path) == []
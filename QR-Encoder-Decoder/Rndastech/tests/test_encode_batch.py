@@ -0,0 +1,69 @@
+"""encode.py's batch command: repeated payloads, rendered in a thread pool so renders can be counted."""
+
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import encode
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Counts build_qr calls by payload, with the batch workers running as threads of this process."""
+    counts = {}
+    lock = threading.Lock()
+    build_qr = encode.build_qr
+
+    def counting_build_qr(data, mask=None):
+        with lock:
+            counts[data] = counts.get(data, 0) + 1
+        return build_qr(data, mask)
+
+    monkeypatch.setattr(encode, 'build_qr', counting_build_qr)
+    monkeypatch.setattr(encode, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    return counts
+
+
+def write_manifest(path, payloads):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'data'])
+        for i, payload in enumerate(payloads):
+            writer.writerow([f"row-{i}", payload])
+
+
+@pytest.mark.parametrize('jobs', [1, 4, 8])
+def test_repeated_payloads_render_once(tmp_path, renders, jobs):
+    payloads = [f"payload-{i % 10}" for i in range(1200)]
+    manifest = tmp_path / 'rows.csv'
+    write_manifest(manifest, payloads)
+    cache = encode.SymbolCache()
+
+    written = encode.encode_batch(str(manifest), str(tmp_path / 'out'), jobs=jobs, mask=0, cache=cache)
+
+    assert written == len(payloads)
+    assert renders == {payload.encode(): 1 for payload in set(payloads)}
+    assert (cache.hits, cache.misses) == (1190, 10)
+    with open(tmp_path / 'out' / 'row-0.png', 'rb') as first, open(tmp_path / 'out' / 'row-10.png', 'rb') as repeat:
+        assert first.read() == repeat.read()
+
+
+def test_repeated_payloads_render_once_without_cache(tmp_path, renders):
+    # With no cache, repeats still share the render while it is in flight
+    manifest = tmp_path / 'rows.csv'
+    write_manifest(manifest, ['same'] * 50)
+
+    assert encode.encode_batch(str(manifest), str(tmp_path / 'out'), jobs=2, mask=0) == 50
+    assert renders == {b'same': 1}
+
+
+def test_repeated_payload_failure_fails_every_row(tmp_path, renders, capsys):
+    manifest = tmp_path / 'rows.csv'
+    write_manifest(manifest, ['ok', 'x' * 4000, 'x' * 4000])
+
+    assert encode.encode_batch(str(manifest), str(tmp_path / 'out'), jobs=2, mask=0) == 1
+    assert sorted(os.listdir(tmp_path / 'out')) == ['row-0.png']
+    assert capsys.readouterr().out.count('exceed the capacity') == 2
@@ -0,0 +1,41 @@
+"""
+`encode.py encode` accepts every kind of input with every compression option:
+named files (read through a memory map), stdin and empty files, uncompressed,
+with each codec and with auto selection.
+"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+from encode import PNG_SIGNATURE, compressors
+
+ENCODER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'encode.py')
+
+SAMPLES = {
+    'notes.csv': '\n'.join(f"{i},item-{i},{i * 3}" for i in range(120)).encode(),
+    'short.txt': b'hello world 12345\n',
+    'empty.txt': b'',
+}
+
+
+@pytest.mark.parametrize('from_stdin', [False, True], ids=['file', 'stdin'])
+@pytest.mark.parametrize('compress', [None, 'auto', *compressors()], ids=str)
+@pytest.mark.parametrize('sample', SAMPLES)
+def test_encode(tmp_path, sample, compress, from_stdin):
+    path = tmp_path / sample
+    path.write_bytes(SAMPLES[sample])
+    output_image = tmp_path / 'out.png'
+    options = ['-c', compress] if compress else []
+
+    with open(path, 'rb') as source:
+        result = subprocess.run([sys.executable, ENCODER, 'encode', '-' if from_stdin else str(path),
+                                 str(output_image), *options],
+                                stdin=source if from_stdin else None, capture_output=True, text=True)
+    output = (result.stdout + result.stderr).strip()
+
+    # The encoder reports errors without a failing exit status
+    assert result.returncode == 0 and 'Error' not in output, output
+    assert output_image.read_bytes()[:len(PNG_SIGNATURE)] == PNG_SIGNATURE
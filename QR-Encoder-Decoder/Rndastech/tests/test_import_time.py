@@ -0,0 +1,72 @@
+"""
+Cold start of the decoders: modules that only some code paths need (Pillow,
+pyzbar, sqlite3, multiprocessing, http.server, ...) stay unimported by
+`import decoder` and by the CLI's argument-error path, whose top-level imports
+(median of several `python -X importtime` runs) fit the budget.
+"""
+
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+import pytest
+
+TREE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+# Decoder CLI and the arguments that make it exit before doing any work
+DECODERS = {
+    'Rndastech': ('Rndastech/decoder/decoder.py', ['--help']),
+    'Puravi': ('Puravi/decoder/decoder.py', []),
+}
+
+# Modules that must only be imported by the code paths that use them (not lzma:
+# argparse's help output imports shutil, which imports it)
+LAZY_MODULES = ['PIL', 'pyzbar', 'sqlite3', 'multiprocessing', 'concurrent.futures', 'http.server',
+                'hashlib', 'base64', 'zstandard', 'cProfile', 'pstats', 'dataclasses', 'inspect', 'asyncio']
+
+# Includes the interpreter's own startup imports (site, encodings: ~10 ms)
+BUDGET_MS = 75
+RUNS = 5
+
+
+def import_profile(script, args):
+    """Returns {module: (cumulative microseconds, nested)} for every import of one CLI run."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(TREE, script), *args],
+                            capture_output=True, text=True)
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            # Nested imports are indented below the module that triggered them
+            imports[name.strip()] = (int(cumulative), name.startswith('  '))
+    return imports
+
+
+def lazy_modules_in(modules):
+    return [module for module in LAZY_MODULES
+            if any(module == m or m.startswith(module + '.') for m in modules)]
+
+
+@pytest.mark.parametrize('author', DECODERS)
+def test_import_loads_no_lazy_modules(author):
+    directory = os.path.dirname(os.path.join(TREE, DECODERS[author][0]))
+    result = subprocess.run([sys.executable, '-c', "import json, sys, decoder; print(json.dumps(list(sys.modules)))"],
+                            cwd=directory, capture_output=True, text=True, check=True)
+    assert lazy_modules_in(json.loads(result.stdout)) == []
+
+
+@pytest.mark.parametrize('author', DECODERS)
+def test_cli_startup_loads_no_lazy_modules(author):
+    assert lazy_modules_in(import_profile(*DECODERS[author])) == []
+
+
+@pytest.mark.parametrize('author', DECODERS)
+def test_cli_import_time_within_budget(author):
+    totals = [sum(us for us, nested in import_profile(*DECODERS[author]).values() if not nested)
+              for _ in range(RUNS)]
+    total_ms = statistics.median(totals) / 1e3
+    assert total_ms <= BUDGET_MS, f"{total_ms:.1f} ms of imports (budget {BUDGET_MS} ms)"
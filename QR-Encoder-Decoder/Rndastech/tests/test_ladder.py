@@ -0,0 +1,47 @@
+"""The Rndastech decoder's robustness ladder under a time budget, with slow fake candidate scans."""
+
+import time
+import threading
+
+import pytest
+
+pytestmark = pytest.mark.parametrize('decoder_module', ['Rndastech'], indirect=True)
+
+
+@pytest.fixture
+def slow_scans(decoder_module, monkeypatch):
+    """Makes every ladder candidate scan block until released, recording the most seen running at once."""
+    state = {'running': 0, 'peak': 0}
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def ladder_scan(self, gray, stage, variant):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        release.wait(10)
+        with lock:
+            state['running'] -= 1
+        return []
+
+    monkeypatch.setattr(decoder_module.QRDecoder, '_ladder_scan', ladder_scan)
+    yield state
+    release.set()
+
+
+def test_timed_out_scans_stay_within_ladder_workers(decoder_module, slow_scans):
+    from PIL import Image
+
+    stages = [decoder_module.PreprocessStage.OTSU, decoder_module.PreprocessStage.SHARPEN,
+              decoder_module.PreprocessStage.ROTATE]
+    options = decoder_module.PreprocessOptions(stages=tuple(stages), ladder_workers=2, time_budget=0.05)
+    decoder = decoder_module.QRDecoder(options)
+    gray = Image.new('L', (64, 64), 255)
+
+    # Every image runs out of time while its scans are still going
+    for _ in range(5):
+        with pytest.raises(decoder_module.QRCodeNotFoundError, match='time budget'):
+            decoder._scan_ladder(gray, stages, time.perf_counter() + options.time_budget)
+
+    assert slow_scans['peak'] <= 2
+    assert sum(thread.name.startswith('qr-ladder') for thread in threading.enumerate()) <= 2
@@ -0,0 +1,72 @@
+"""encode.py's codeword builder and Reed-Solomon engine against qrcode, for every version and error correction level."""
+
+import random
+
+import pytest
+import qrcode
+from qrcode import util
+
+from encode import CAPACITY, FastQRCode, create_codewords, plan_segments, rs_remainder
+
+LEVELS = {'L': qrcode.constants.ERROR_CORRECT_L, 'M': qrcode.constants.ERROR_CORRECT_M,
+          'Q': qrcode.constants.ERROR_CORRECT_Q, 'H': qrcode.constants.ERROR_CORRECT_H}
+ALPHABETS = {util.MODE_NUMBER: b'0123456789', util.MODE_ALPHA_NUM: util.ALPHA_NUM}
+PAYLOADS = 6
+EC_COUNTS = sorted({block.total_count - block.data_count for version in range(1, 41)
+                    for level in LEVELS.values() for block in qrcode.base.rs_blocks(version, level)})
+
+
+def payloads(rng, version, level, count):
+    """Yields segment lists that fit version at level: single-mode runs of random length and mixed data."""
+    for _ in range(count):
+        mode = rng.choice((util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE))
+        length = rng.choice((0, 1, rng.randint(0, CAPACITY[mode, level][version - 1]),
+                             CAPACITY[mode, level][version - 1]))
+        if mode == util.MODE_8BIT_BYTE:
+            data = rng.randbytes(length)
+        else:
+            data = bytes(rng.choice(ALPHABETS[mode]) for _ in range(length))
+        yield [util.QRData(data, mode=mode, check_data=False)]
+
+    # Mixed content through the optimal segmentation, sized to need this version
+    if level == qrcode.constants.ERROR_CORRECT_L:
+        data = b''.join(rng.choice((b'12345678', b'ABC-DEF ', rng.randbytes(6)))
+                        for _ in range(CAPACITY[util.MODE_8BIT_BYTE, level][version - 1] // 8))
+        fitted, segments = plan_segments(data)
+        if fitted == version:
+            yield segments
+
+
+@pytest.mark.parametrize('ec_count', EC_COUNTS)
+def test_remainder_matches_polynomial_division(ec_count):
+    rng = random.Random(ec_count)
+    block = rng.randbytes(rng.randint(1, 150))
+    generator = qrcode.base.Polynomial([1], 0)
+    for i in range(ec_count):
+        generator = generator * qrcode.base.Polynomial([1, qrcode.base.gexp(i)], 0)
+    remainder = qrcode.base.Polynomial(list(block), ec_count) % generator
+    assert list(rs_remainder(block, ec_count)) == [0] * (ec_count - len(remainder)) + list(remainder)
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('version', range(1, 41))
+def test_codewords_match_qrcode(version, level):
+    rng = random.Random(f"{version}-{level}")
+    for index, segments in enumerate(payloads(rng, version, LEVELS[level], PAYLOADS)):
+        expected = util.create_data(version, LEVELS[level], segments)
+        assert list(create_codewords(version, LEVELS[level], segments)) == expected, (
+            f"payload {index} ({', '.join(f'mode {s.mode}: {len(s)}' for s in segments)})")
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('version', [1, 2, 7, 10, 20, 27, 40])
+def test_symbol_matches_qrcode(version, level):
+    # Same codewords must give the same symbol, masks included
+    segments = next(payloads(random.Random(f"{version}-{level}"), version, LEVELS[level], 1))
+    fast = FastQRCode(version=version, error_correction=LEVELS[level])
+    plain = qrcode.QRCode(version=version, error_correction=LEVELS[level])
+    for qr in (fast, plain):
+        for segment in segments:
+            qr.add_data(segment)
+        qr.make(fit=False)
+    assert fast.modules == plain.modules
@@ -5,12 +5,12 @@ import os
 def encode_file_to_qr(input_file, output_file):
     if not os.path.isfile(input_file):
         raise FileNotFoundError(f"The file '{input_file}' does not exist.")
+    # Check the size before reading, so oversized files are never loaded
+    if os.path.getsize(input_file) > 2953:
+        raise ValueError("The file is too large to encode into a single QR code.")
     with open(input_file, 'rb') as file:
         file_content = file.read()
 
-    if len(file_content) > 2953: 
-        raise ValueError("The file is too large to encode into a single QR code.")
-
     qr = qrcode.QRCode(
         version=None, 
         error_correction=qrcode.constants.ERROR_CORRECT_M, 
@@ -11,10 +11,14 @@ def is_base64_encoded(data):
         return False
 
 def bin_to_bytes(bin_str):
-    bin_str = ''.join(bin_str.split())
-    if not all(c in '01' for c in bin_str):
+    bits = bin_str.encode('ascii').translate(None, b' \t\n\r\x0b\x0c')
+    if bits.translate(None, b'01'):
         raise ValueError("Invalid binary string")
-    return bytes(int(bin_str[i:i+8], 2) for i in range(0, len(bin_str), 8))
+    whole = len(bits) - len(bits) % 8
+    data = int(bits[:whole], 2).to_bytes(whole // 8, 'big') if whole else b''
+    if whole < len(bits):
+        data += bytes([int(bits[whole:], 2)])
+    return data
 
 def process_data(input_data, bin_mode):
     try: